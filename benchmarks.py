@@ -0,0 +1,527 @@
+# Course: CS261 - Data Structures
+# Author:
+# Assignment:
+# Description: timing harness for the graph classes, run as `python benchmarks.py` for the dfs()/bfs()
+#              scaling table or `python benchmarks.py --json results.json` for the full suite
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from d_graph import DirectedGraph
+from path_batches import numpy_used
+from ud_graph import UndirectedGraph
+
+
+def legacy_dfs(graph, v_start, v_end=None) -> []:
+    """
+    parameters:
+        graph(DirectedGraph): matrix-backed graph to search
+        v_start(int): vertex to start the search on
+        v_end(int) OPTIONAL: optional vertex to end the search on
+
+    returns:
+        list of visited vertices in visit order
+
+    functionality:
+        The original DirectedGraph.dfs(), kept as the baseline the current traversal is
+        measured against: list membership for visited, full matrix row scan and a sort per pop
+    """
+    to_visit_stack = [v_start]
+    visited_stack = []
+
+    while to_visit_stack:
+        curr_vertex = to_visit_stack.pop()
+        if curr_vertex not in visited_stack:
+            visited_stack.append(curr_vertex)
+            if curr_vertex == v_end:
+                return visited_stack
+            curr_vertex_neighbors = []
+            col_ind = 0
+            while col_ind < graph.v_count:
+                if graph.adj_matrix[curr_vertex][col_ind] > 0:
+                    curr_vertex_neighbors.append(col_ind)
+                col_ind += 1
+            for neighbor in sorted(curr_vertex_neighbors, reverse=True):
+                to_visit_stack.append(neighbor)
+
+    return visited_stack
+
+
+def legacy_bfs(graph, v_start, v_end=None) -> []:
+    """
+    parameters:
+        graph(DirectedGraph): matrix-backed graph to search
+        v_start(int): vertex to start the search on
+        v_end(int) OPTIONAL: optional vertex to end the search on
+
+    returns:
+        list of visited vertices in visit order
+
+    functionality:
+        The original DirectedGraph.bfs(), see legacy_dfs()
+    """
+    to_visit_queue = [v_start]
+    visited_stack = []
+
+    while to_visit_queue:
+        curr_vertex = to_visit_queue.pop(0)
+        if curr_vertex not in visited_stack:
+            visited_stack.append(curr_vertex)
+            if curr_vertex == v_end:
+                return visited_stack
+            curr_vertex_neighbors = []
+            col_ind = 0
+            while col_ind < graph.v_count:
+                if graph.adj_matrix[curr_vertex][col_ind] > 0:
+                    curr_vertex_neighbors.append(col_ind)
+                col_ind += 1
+            for neighbor in sorted(curr_vertex_neighbors):
+                to_visit_queue.append(neighbor)
+
+    return visited_stack
+
+
+def random_edges(v_count, out_degree, seed=0) -> []:
+    """
+    parameters:
+        v_count(int): number of vertices
+        out_degree(int): edges drawn per vertex
+        seed(int): random seed, so runs are comparable
+
+    returns:
+        list of (src, dst, weight) triples
+    """
+    rnd = random.Random(seed)
+    edges = []
+    for src in range(v_count):
+        for _ in range(out_degree):
+            dst = rnd.randrange(v_count)
+            if dst != src:
+                edges.append((src, dst, rnd.randint(1, 20)))
+    return edges
+
+
+def erdos_renyi_edges(v_count, e_count, seed=0) -> []:
+    """
+    parameters:
+        v_count(int): number of vertices
+        e_count(int): number of edges, capped at v_count * (v_count - 1)
+        seed(int): random seed
+
+    returns:
+        list of (src, dst, weight) triples, e_count distinct directed edges drawn uniformly (G(n, m))
+    """
+    rnd = random.Random(seed)
+    e_count = min(e_count, v_count * (v_count - 1))
+    pairs = set()
+    while len(pairs) < e_count:
+        src, dst = rnd.randrange(v_count), rnd.randrange(v_count)
+        if src != dst:
+            pairs.add((src, dst))
+    return [(src, dst, rnd.randint(1, 20)) for src, dst in sorted(pairs)]
+
+
+def power_law_edges(v_count, e_count, seed=0) -> []:
+    """
+    parameters:
+        v_count(int): number of vertices
+        e_count(int): approximate number of edges
+        seed(int): random seed
+
+    returns:
+        list of (src, dst, weight) triples with a heavy tailed degree distribution
+
+    functionality:
+        Preferential attachment (Barabasi-Albert): each new vertex links to about e_count / v_count
+        earlier vertices picked with probability proportional to their degree, every edge getting a
+        random direction so the graph has cycles
+    """
+    rnd = random.Random(seed)
+    per_vertex = max(1, e_count // max(v_count, 1))
+    # every edge end appears once in endpoints, so a uniform pick from it is degree proportional
+    endpoints = list(range(min(per_vertex, v_count)))
+    pairs = set()
+    for src in range(len(endpoints), v_count):
+        targets = set()
+        while len(targets) < min(per_vertex, src):
+            targets.add(rnd.choice(endpoints))
+        for dst in targets:
+            pairs.add((src, dst) if rnd.random() < 0.5 else (dst, src))
+            endpoints.extend((src, dst))
+    return [(src, dst, rnd.randint(1, 20)) for src, dst in sorted(pairs)]
+
+
+def grid_edges(v_count, e_count=None, seed=0) -> []:
+    """
+    parameters:
+        v_count(int): number of vertices, rounded down to a square
+        e_count(int): ignored, a grid's edge count follows from its size
+        seed(int): random seed for the weights
+
+    returns:
+        list of (src, dst, weight) triples of a square grid, each cell linked to its right and lower
+        neighbor in both directions
+    """
+    rnd = random.Random(seed)
+    side = max(1, int(v_count ** 0.5))
+    edges = []
+    for row in range(side):
+        for col in range(side):
+            cell = row * side + col
+            for other in ((cell + 1) if col + 1 < side else None, (cell + side) if row + 1 < side else None):
+                if other is not None:
+                    edges.append((cell, other, rnd.randint(1, 20)))
+                    edges.append((other, cell, rnd.randint(1, 20)))
+    return edges
+
+
+def dag_edges(v_count, e_count, seed=0) -> []:
+    """
+    parameters:
+        v_count(int): number of vertices
+        e_count(int): number of edges, capped at v_count * (v_count - 1) / 2
+        seed(int): random seed
+
+    returns:
+        list of (src, dst, weight) triples, every edge going from a lower to a higher vertex so the
+        graph is acyclic
+    """
+    rnd = random.Random(seed)
+    e_count = min(e_count, v_count * (v_count - 1) // 2)
+    pairs = set()
+    while len(pairs) < e_count:
+        src, dst = rnd.randrange(v_count), rnd.randrange(v_count)
+        if src != dst:
+            pairs.add((min(src, dst), max(src, dst)))
+    return [(src, dst, rnd.randint(1, 20)) for src, dst in sorted(pairs)]
+
+
+# generator per graph family, all called as generator(v_count, e_count, seed)
+GRAPH_FAMILIES = {
+    'erdos_renyi': erdos_renyi_edges,
+    'power_law': power_law_edges,
+    'grid': grid_edges,
+    'dag': dag_edges,
+}
+
+
+def random_walk(edges, length, seed=0) -> []:
+    """
+    parameters:
+        edges(list): (src, dst, ...) tuples
+        length(int): maximum number of vertices in the walk
+        seed(int): random seed
+
+    returns:
+        list of vertices following edges from a random start, a valid path for is_valid_path(). The
+        walk ends early at a vertex without out-edges
+    """
+    rnd = random.Random(seed)
+    out = {}
+    for edge in edges:
+        out.setdefault(edge[0], []).append(edge[1])
+    if not out:
+        return []
+
+    walk = [rnd.choice(sorted(out))]
+    while len(walk) < length and walk[-1] in out:
+        walk.append(rnd.choice(out[walk[-1]]))
+    return walk
+
+
+def best_time(func, *args, repeat=3) -> float:
+    """
+    parameters:
+        func(callable): function to time
+        args: arguments passed to func
+        repeat(int): number of runs
+
+    returns:
+        fastest wall time in seconds over repeat runs
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def best_time_after_edit(edit, func, *args, repeat=3) -> float:
+    """
+    parameters:
+        edit(callable): graph mutation run, untimed, before every timed call
+        func(callable): function to time
+        args: arguments passed to func
+        repeat(int): number of runs
+
+    returns:
+        fastest wall time in seconds of func(*args) over repeat runs, each right after edit(), so
+        whatever the edit invalidates is rebuilt inside the timed call
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        edit()
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def edge_toggler(graph, u, v):
+    """
+    parameters:
+        graph(DirectedGraph or UndirectedGraph): graph to edit
+        u, v: endpoints of the edge to toggle
+
+    returns:
+        callable that removes the edge u - v if it is there and adds it (weight 1) otherwise, so
+        repeated edits leave the graph as it was every second call
+    """
+    def toggle():
+        if graph.is_valid_path([u, v]):
+            graph.remove_edge(u, v)
+        else:
+            graph.add_edge(u, v)
+    return toggle
+
+
+def traversal_scaling(sizes=(250, 500, 1000, 2000, 4000), out_degree=4, legacy_limit=2000) -> []:
+    """
+    parameters:
+        sizes(tuple): vertex counts to measure
+        out_degree(int): edges per vertex of the random graphs
+        legacy_limit(int): largest size the legacy traversals are run on, they are cubic
+
+    returns:
+        list of dicts, one per size, with the timings in seconds
+
+    functionality:
+        Times dfs()/bfs() from vertex 0 against the legacy versions on matrix storage and
+        checks that both produce the same visit order
+    """
+    results = []
+    for v_count in sizes:
+        graph = DirectedGraph(random_edges(v_count, out_degree))
+        row = {'v_count': v_count, 'e_count': len(graph.get_edges())}
+        for name, current, legacy in (('dfs', graph.dfs, legacy_dfs), ('bfs', graph.bfs, legacy_bfs)):
+            row[name] = best_time(current, 0)
+            if v_count <= legacy_limit:
+                if current(0) != legacy(graph, 0):
+                    raise RuntimeError(f'{name} visit order changed')
+                row[f'legacy_{name}'] = best_time(legacy, graph, 0, repeat=1)
+        results.append(row)
+    return results
+
+
+def multi_source_scaling(sizes=(10000, 30000, 100000), avg_degree=3, source_count=64, repeat=1) -> []:
+    """
+    parameters:
+        sizes(tuple): vertex counts to measure
+        avg_degree(int): average edges per vertex of the csr random graphs
+        source_count(int): number of sources
+        repeat(int): runs per method, the fastest counts
+
+    returns:
+        list of dicts, one per size, with the timings in seconds
+
+    functionality:
+        Times multi_source_bfs() over source_count sources spread over the graph, the sweep alone
+        and with every per-source dict decoded, with and without numpy, against one bfs() per
+        source, and checks that the distances agree with bfs() for the first source
+    """
+    results = []
+    for v_count in sizes:
+        graph = DirectedGraph(erdos_renyi_edges(v_count, avg_degree * v_count), storage='csr')
+        sources = list(range(0, v_count, max(1, v_count // source_count)))[:source_count]
+
+        def bfs_each():
+            return [graph.bfs(src) for src in sources]
+
+        def decoded(use_numpy):
+            return list(graph.multi_source_bfs(sources, use_numpy))
+
+        if set(graph.multi_source_bfs(sources)[0]) != set(graph.bfs(sources[0])):
+            raise RuntimeError('multi_source_bfs reached set differs from bfs')
+
+        row = {'v_count': v_count, 'e_count': graph.edge_count(), 'sources': len(sources),
+               'bfs_each': best_time(bfs_each, repeat=repeat)}
+        for suffix, use_numpy in (('', True), ('_no_numpy', False)):
+            if use_numpy and not numpy_used():
+                continue
+            row['sweep' + suffix] = best_time(graph.multi_source_bfs, sources, use_numpy, repeat=repeat)
+            row['decoded' + suffix] = best_time(decoded, use_numpy, repeat=repeat)
+        results.append(row)
+    return results
+
+
+def time_directed(edges, v_count, storage='matrix', repeat=3) -> dict:
+    """
+    parameters:
+        edges(list): (src, dst, weight) triples
+        v_count(int): number of vertices
+        storage(str): DirectedGraph storage mode, weights are dropped for 'bitset'
+        repeat(int): runs per method, the fastest counts
+
+    returns:
+        dict of method name -> seconds for one call (add_edge: inserting every edge). The
+        '<method>_after_edit' entries time the call right after an edge far from vertex 0 was
+        toggled, see best_time_after_edit()
+    """
+    if storage == 'bitset':
+        # bitset storage only takes unweighted edges
+        edges = [(src, dst, 1) for src, dst, _ in edges]
+
+    def build():
+        graph = DirectedGraph(storage=storage)
+        graph.reserve(v_count)
+        for _ in range(v_count):
+            graph.add_vertex()
+        for src, dst, weight in edges:
+            graph.add_edge(src, dst, weight)
+        return graph
+
+    graph = build()
+    # every dijkstra() call should search, not hit the result cache
+    graph.dijkstra_cache_size = 0
+    path = random_walk(edges, 100)
+    edit = edge_toggler(graph, v_count - 1, max(v_count - 2, 0))
+    return {
+        'add_edge': best_time(build, repeat=repeat),
+        'get_edges': best_time(graph.get_edges, repeat=repeat),
+        'is_valid_path': best_time(graph.is_valid_path, path, repeat=repeat),
+        'dfs': best_time(graph.dfs, 0, repeat=repeat),
+        'bfs': best_time(graph.bfs, 0, repeat=repeat),
+        'has_cycle': best_time(graph.has_cycle, repeat=repeat),
+        'dijkstra': best_time(graph.dijkstra, 0, repeat=repeat),
+        'dfs_after_edit': best_time_after_edit(edit, graph.dfs, 0, repeat=repeat),
+        'bfs_after_edit': best_time_after_edit(edit, graph.bfs, 0, repeat=repeat),
+        'has_cycle_after_edit': best_time_after_edit(edit, graph.has_cycle, repeat=repeat),
+        'dijkstra_after_edit': best_time_after_edit(edit, graph.dijkstra, 0, repeat=repeat),
+    }
+
+
+def time_undirected(edges, v_count, repeat=3) -> dict:
+    """
+    parameters:
+        edges(list): (src, dst, weight) triples, used without direction and weight
+        v_count(int): number of vertices
+        repeat(int): runs per method, the fastest counts
+
+    returns:
+        dict of method name -> seconds for one call (add_edge: inserting every edge), with
+        '<method>_after_edit' entries as in time_directed()
+    """
+    labels = [str(vertex) for vertex in range(v_count)]
+    pairs = [(labels[src], labels[dst]) for src, dst, _ in edges]
+
+    def build():
+        graph = UndirectedGraph()
+        for label in labels:
+            graph.add_vertex(label)
+        for u, v in pairs:
+            graph.add_edge(u, v)
+        return graph
+
+    graph = build()
+    path = random_walk(pairs + [(v, u) for u, v in pairs], 100)
+    edit = edge_toggler(graph, labels[-1], labels[max(v_count - 2, 0)])
+    return {
+        'add_edge': best_time(build, repeat=repeat),
+        'get_edges': best_time(graph.get_edges, repeat=repeat),
+        'is_valid_path': best_time(graph.is_valid_path, path, repeat=repeat),
+        'dfs': best_time(graph.dfs, labels[0], repeat=repeat),
+        'bfs': best_time(graph.bfs, labels[0], repeat=repeat),
+        'has_cycle': best_time(graph.has_cycle, repeat=repeat),
+        'count_connected_components': best_time(graph.count_connected_components, repeat=repeat),
+        'dfs_after_edit': best_time_after_edit(edit, graph.dfs, labels[0], repeat=repeat),
+        'bfs_after_edit': best_time_after_edit(edit, graph.bfs, labels[0], repeat=repeat),
+        'has_cycle_after_edit': best_time_after_edit(edit, graph.has_cycle, repeat=repeat),
+        'count_connected_components_after_edit': best_time_after_edit(
+            edit, graph.count_connected_components, repeat=repeat),
+    }
+
+
+def run_suite(sizes=(250, 500, 1000), avg_degree=4, families=tuple(GRAPH_FAMILIES),
+              storages=DirectedGraph.STORAGE_MODES, repeat=3, seed=0) -> dict:
+    """
+    parameters:
+        sizes(tuple): vertex counts to measure
+        avg_degree(int): edges per vertex asked of the generators
+        families(tuple): keys of GRAPH_FAMILIES to generate
+        storages(tuple): DirectedGraph storage modes to measure
+        repeat(int): runs per method, the fastest counts
+        seed(int): random seed handed to every generator, so runs are reproducible
+
+    returns:
+        JSON serializable dict: 'meta' describing the run and the environment, 'results' with one
+        record per graph class/storage, family, size and method
+
+    functionality:
+        Times every public method of DirectedGraph (once per storage mode) and UndirectedGraph on
+        the same generated edge lists
+    """
+    results = []
+    for family in families:
+        for v_count in sizes:
+            edges = GRAPH_FAMILIES[family](v_count, v_count * avg_degree, seed)
+            v_used = max((max(src, dst) for src, dst, _ in edges), default=0) + 1
+            runs = [('DirectedGraph', storage, time_directed(edges, v_used, storage, repeat))
+                    for storage in storages]
+            runs.append(('UndirectedGraph', None, time_undirected(edges, v_used, repeat)))
+            for graph_class, storage, timings in runs:
+                for method, seconds in timings.items():
+                    results.append({
+                        'graph': graph_class, 'storage': storage, 'family': family,
+                        'v_count': v_used, 'e_count': len(edges), 'method': method, 'seconds': seconds,
+                    })
+
+    meta = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'sizes': list(sizes), 'avg_degree': avg_degree, 'families': list(families),
+        'storages': list(storages), 'repeat': repeat, 'seed': seed,
+    }
+    return {'meta': meta, 'results': results}
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='time the graph classes')
+    parser.add_argument('--json', metavar='PATH',
+                        help='run the full suite over every graph family and write the results to PATH')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[250, 500, 1000])
+    parser.add_argument('--degree', type=int, default=4, help='average edges per vertex')
+    parser.add_argument('--families', nargs='+', choices=sorted(GRAPH_FAMILIES), default=list(GRAPH_FAMILIES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.json:
+        suite = run_suite(args.sizes, args.degree, args.families, repeat=args.repeat, seed=args.seed)
+        with open(args.json, 'w') as out:
+            json.dump(suite, out, indent=1)
+        print(f"{len(suite['results'])} timings written to {args.json}")
+        sys.exit()
+
+    print("\nDirectedGraph dfs()/bfs() scaling, seconds")
+    print("------------------------------------------")
+    print('{:>7} {:>7} {:>10} {:>10} {:>10} {:>10}'.format('V', 'E', 'dfs', 'legacy', 'bfs', 'legacy'))
+    for row in traversal_scaling():
+        print('{:>7} {:>7} {:>10.5f} {:>10} {:>10.5f} {:>10}'.format(
+            row['v_count'], row['e_count'],
+            row['dfs'], '{:.5f}'.format(row['legacy_dfs']) if 'legacy_dfs' in row else '-',
+            row['bfs'], '{:.5f}'.format(row['legacy_bfs']) if 'legacy_bfs' in row else '-'))
+
+    print("\nDirectedGraph multi_source_bfs() against one bfs() per source, csr, seconds")
+    print("--------------------------------------------------------------------------")
+    columns = ('bfs_each', 'sweep', 'decoded', 'sweep_no_numpy', 'decoded_no_numpy')
+    print('{:>7} {:>7} {:>7}'.format('V', 'E', 'sources') + ''.join('{:>17}'.format(c) for c in columns))
+    for row in multi_source_scaling():
+        print('{:>7} {:>7} {:>7}'.format(row['v_count'], row['e_count'], row['sources'])
+              + ''.join('{:>17}'.format('{:.3f}'.format(row[c]) if c in row else '-') for c in columns))
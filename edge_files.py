@@ -0,0 +1,77 @@
+# Course: CS261 - Data Structures
+# Author:
+# Assignment:
+# Description: streaming reader for edge list files, used by the graph classes' from_edge_file()
+
+import os
+import time
+
+
+def read_edge_chunks(path, delimiter=None, header=False, chunk_size=1 << 20):
+    """
+    parameters:
+        path(str): edge list file, one edge per line
+        delimiter(str) OPTIONAL: field separator, defaults to ',' for .csv files and any
+            whitespace (tabs included) otherwise
+        header(bool) OPTIONAL: skip the first non-comment line
+        chunk_size(int) OPTIONAL: approximate number of bytes read per chunk
+
+    returns:
+        generator of lists, each holding the split fields of the edge lines of one chunk
+
+    functionality:
+        Reads the file chunk by chunk so only one chunk of lines is held in memory at a time.
+        Blank lines and lines starting with '#' are skipped
+    """
+    path = os.fspath(path)
+    if delimiter is None and path.endswith('.csv'):
+        delimiter = ','
+
+    with open(path) as edge_file:
+        skip_header = header
+        while True:
+            lines = edge_file.readlines(chunk_size)
+            if not lines:
+                return
+
+            rows = []
+            for line in lines:
+                line = line.strip()
+                if not line or line[0] == '#':
+                    continue
+                if skip_header:
+                    skip_header = False
+                    continue
+                rows.append(line.split(delimiter))
+            yield rows
+
+
+class LoadProgress:
+    """
+    Edge counter for from_edge_file(), passes the running count and throughput to an optional
+    progress(edges_loaded, edges_per_second) callback after every chunk
+    """
+
+    def __init__(self, progress=None):
+        self.progress = progress
+        self.edges_loaded = 0
+        self.start = time.perf_counter()
+
+    def edges_per_second(self) -> float:
+        """
+        returns:
+            edges loaded per second since the load started
+        """
+        elapsed = time.perf_counter() - self.start
+        if elapsed <= 0:
+            return float('inf')
+        return self.edges_loaded / elapsed
+
+    def update(self, edges: int) -> None:
+        """
+        parameters:
+            edges(int): edges loaded from the last chunk
+        """
+        self.edges_loaded += edges
+        if self.progress is not None:
+            self.progress(self.edges_loaded, self.edges_per_second())
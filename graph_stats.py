@@ -0,0 +1,155 @@
+# Course: CS261 - Data Structures
+# Author:
+# Assignment:
+# Description: opt-in per-call counters for the graph classes' traversal and shortest path methods
+
+import heapq
+import time
+
+
+class CallStats:
+    """
+    Counters of one dfs(), bfs(), has_cycle() or dijkstra() call
+    - vertices_settled: vertices visited, finished or settled
+    - edges_relaxed: edges looked at
+    - heap_pushes / heap_pops: priority queue operations (dijkstra only)
+    - peak_frontier: largest size the stack, queue, level or heap reached
+    - wall_time: seconds spent in the call
+    """
+
+    FIELDS = ('vertices_settled', 'edges_relaxed', 'heap_pushes', 'heap_pops',
+              'peak_frontier', 'wall_time')
+
+    def __init__(self, method: str):
+        self.method = method
+        self.vertices_settled = 0
+        self.edges_relaxed = 0
+        self.heap_pushes = 0
+        self.heap_pops = 0
+        self.peak_frontier = 0
+        self.wall_time = 0.0
+        self._start = time.perf_counter()
+
+    def finish(self) -> None:
+        """
+        Stops the clock
+        """
+        self.wall_time = time.perf_counter() - self._start
+
+    def as_dict(self) -> dict:
+        """
+        returns:
+            dict with the method name and every counter
+        """
+        out = {'method': self.method}
+        for field in self.FIELDS:
+            out[field] = getattr(self, field)
+        return out
+
+    def __repr__(self):
+        counters = ', '.join(f'{field}={getattr(self, field)!r}' for field in self.FIELDS)
+        return f'CallStats({self.method!r}, {counters})'
+
+
+class StatsRecorder:
+    """
+    Ready-made stats_hook: keeps the CallStats of the last `limit` calls (all of them if limit is
+    None) in `calls`, most recent last
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.calls = []
+
+    def __call__(self, stats: CallStats) -> None:
+        self.calls.append(stats)
+        if self.limit is not None and len(self.calls) > self.limit:
+            del self.calls[0]
+
+    @property
+    def last(self):
+        """
+        returns:
+            CallStats of the most recent call, None if there was none
+        """
+        return self.calls[-1] if self.calls else None
+
+
+# The helpers below wrap the primitives a hot loop binds to local names. An instrumented call binds
+# the wrappers instead, a plain call binds the originals, so the loops carry no checks when stats
+# are off.
+
+def counted_neighbors(neighbors, stats: CallStats):
+    """
+    parameters:
+        neighbors(callable): vertex -> neighbors or (neighbor, weight) pairs
+        stats(CallStats): counters to update
+
+    returns:
+        drop-in replacement for neighbors that counts the edges it returns
+    """
+    def counted(vertex):
+        result = neighbors(vertex)
+        if not hasattr(result, '__len__'):
+            result = list(result)
+        stats.edges_relaxed += len(result)
+        return result
+    return counted
+
+
+def counted_bit_rows(bit_rows, stats: CallStats):
+    """
+    parameters:
+        bit_rows(list): bitset adjacency rows, bit d of bit_rows[v] set for an edge v -> d
+        stats(CallStats): counters to update
+
+    returns:
+        drop-in replacement for bit_rows.__getitem__ that counts the edges of every row it returns
+    """
+    def counted(vertex):
+        row = bit_rows[vertex]
+        stats.edges_relaxed += bin(row).count('1')
+        return row
+    return counted
+
+
+def counted_append(container, stats: CallStats):
+    """
+    parameters:
+        container(list): stack or queue
+        stats(CallStats): counters to update
+
+    returns:
+        drop-in replacement for container.append that tracks peak_frontier
+    """
+    append = container.append
+
+    def counted(item):
+        append(item)
+        if len(container) > stats.peak_frontier:
+            stats.peak_frontier = len(container)
+    return counted
+
+
+def counted_heappush(stats: CallStats):
+    """
+    returns:
+        drop-in replacement for heapq.heappush counting pushes and tracking peak_frontier
+    """
+    def counted(heap, item):
+        heapq.heappush(heap, item)
+        stats.heap_pushes += 1
+        if len(heap) > stats.peak_frontier:
+            stats.peak_frontier = len(heap)
+    return counted
+
+
+def counted_heappop(stats: CallStats):
+    """
+    returns:
+        drop-in replacement for heapq.heappop counting pops
+    """
+    def counted(heap):
+        stats.heap_pops += 1
+        return heapq.heappop(heap)
+    return counted
@@ -0,0 +1,167 @@
+# Course: CS261 - Data Structures
+# Author:
+# Assignment:
+# Description: batch path validation, used by the graph classes' validate_paths()
+
+from itertools import chain
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, paths are then checked one hop at a time against a set
+    np = None
+
+
+def flatten_paths(paths):
+    """
+    parameters:
+        paths(iterable): sequences of vertices
+
+    returns:
+        (flat, offsets) tuple: the vertices of all paths back to back in one list, path i being
+        flat[offsets[i]:offsets[i + 1]]
+    """
+    flat = []
+    offsets = [0]
+    for path in paths:
+        flat.extend(path)
+        offsets.append(len(flat))
+    return flat, offsets
+
+
+def numpy_used(use_numpy=True) -> bool:
+    """
+    returns:
+        True if check_paths() with this use_numpy runs on numpy, i.e. it is requested and installed
+    """
+    return np is not None and use_numpy
+
+
+def check_paths(flat, offsets, v_count, edge_keys, use_numpy=True, key_set=None):
+    """
+    parameters:
+        flat(sequence): vertex ids of all paths back to back
+        offsets(sequence): path i is flat[offsets[i]:offsets[i + 1]]
+        v_count(int): ids 0 up to v_count - 1 are vertices
+        edge_keys(sequence): src * v_count + dst of every edge, ascending
+        use_numpy(bool) OPTIONAL: set to False to skip numpy even if it is installed
+        key_set(set) OPTIONAL: the edge keys as a set, for callers that keep one between calls;
+            only used without numpy, built from edge_keys when not given
+
+    returns:
+        one boolean per path, True when every id is a vertex and every consecutive pair an edge
+        (an empty path is valid): a numpy bool array when numpy is used, else a list
+
+    functionality:
+        With numpy, every hop of the batch becomes a key and one np.searchsorted() over the sorted
+        edge keys looks them all up, O(log E) per hop and no copy or sort of the keys. A vertex
+        position is flagged bad if it is out of range or starts a missing hop, hops across
+        two paths are ignored, and a cumulative sum of the flags gives the number of bad positions
+        per path without a Python loop. Without numpy each hop is a set lookup
+    """
+    if numpy_used(use_numpy):
+        flat = np.asarray(flat, dtype=np.int64)
+        offsets = np.asarray(offsets, dtype=np.int64)
+        bad = (flat < 0) | (flat >= v_count)
+
+        if len(flat) > 1:
+            keys = np.asarray(edge_keys, dtype=np.int64)
+            hops = flat[:-1] * v_count + flat[1:]
+            if len(keys):
+                hop_ok = keys[np.minimum(np.searchsorted(keys, hops), len(keys) - 1)] == hops
+            else:
+                hop_ok = np.zeros(len(hops), dtype=bool)
+            # hop j runs from flat[j] to flat[j + 1], it crosses into the next path when a path
+            # starts at j + 1
+            starts = offsets[1:-1] - 1
+            hop_ok[starts[(starts >= 0) & (starts < len(flat) - 1)]] = True
+            bad[:-1] |= ~hop_ok
+
+        bad_before = np.concatenate(([0], np.cumsum(bad)))
+        return bad_before[offsets[1:]] == bad_before[offsets[:-1]]
+
+    keys = key_set if key_set is not None else set(edge_keys)
+    results = []
+    for path_index in range(len(offsets) - 1):
+        start, end = offsets[path_index], offsets[path_index + 1]
+        valid = True
+        prev_vertex = None
+        for pos in range(start, end):
+            vertex = flat[pos]
+            if vertex < 0 or vertex >= v_count:
+                valid = False
+                break
+            if prev_vertex is not None and prev_vertex * v_count + vertex not in keys:
+                valid = False
+                break
+            prev_vertex = vertex
+        results.append(valid)
+    return results
+
+
+# check_paths() arguments shared by every batch of one validate_flat_paths() call, set in each
+# worker process by _init_path_worker()
+_worker_graph = None
+
+
+def _init_path_worker(v_count, edge_keys, use_numpy) -> None:
+    """
+    ProcessPoolExecutor initializer, keeps the edge keys (and their set without numpy) so they are
+    sent and built once per worker
+    """
+    global _worker_graph
+    key_set = None if numpy_used(use_numpy) else set(edge_keys)
+    _worker_graph = (v_count, edge_keys, use_numpy, key_set)
+
+
+def _check_path_batch(flat, offsets):
+    """
+    Worker task: check_paths() on one batch of paths
+    """
+    v_count, edge_keys, use_numpy, key_set = _worker_graph
+    return check_paths(flat, offsets, v_count, edge_keys, use_numpy, key_set)
+
+
+def validate_flat_paths(flat, offsets, v_count, edge_keys, workers=None, use_numpy=True,
+                        key_set=None):
+    """
+    parameters:
+        flat, offsets, v_count, edge_keys, use_numpy, key_set: see check_paths()
+        workers(int) OPTIONAL: number of worker processes, by default the paths are checked in
+            this process
+
+    returns:
+        check_paths() result for the whole batch
+
+    functionality:
+        With workers, the paths are cut into about four batches per worker, each checked by
+        check_paths() in a ProcessPoolExecutor, and the results are joined in order
+    """
+    path_count = len(offsets) - 1
+    if workers is None or workers <= 1 or path_count < 2:
+        return check_paths(flat, offsets, v_count, edge_keys, use_numpy, key_set)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with_numpy = numpy_used(use_numpy)
+    if with_numpy:
+        flat = np.asarray(flat, dtype=np.int64)
+        offsets = np.asarray(offsets, dtype=np.int64)
+
+    batch_size = max(1, path_count // (4 * workers))
+    flats, batch_offsets = [], []
+    for first in range(0, path_count, batch_size):
+        last = min(first + batch_size, path_count)
+        start, end = offsets[first], offsets[last]
+        flats.append(flat[start:end])
+        if with_numpy:
+            batch_offsets.append(offsets[first:last + 1] - start)
+        else:
+            batch_offsets.append([offset - start for offset in offsets[first:last + 1]])
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_path_worker,
+                             initargs=(v_count, edge_keys, use_numpy)) as pool:
+        results = list(pool.map(_check_path_batch, flats, batch_offsets))
+
+    if with_numpy:
+        return np.concatenate(results)
+    return list(chain.from_iterable(results))
@@ -0,0 +1,985 @@
+# Course: CS261 - Data Structures
+# Author:
+# Assignment:
+# Description: randomized regression checks for the graph classes, run as `python regression_checks.py`.
+#              Each check compares a method with a brute force reference or a baseline version on random
+#              graphs, after every random edit
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+from array import array
+from collections import deque
+
+from benchmarks import legacy_bfs, legacy_dfs
+from d_graph import DirectedGraph
+from graph_stats import CallStats, StatsRecorder
+from ud_graph import UndirectedGraph
+
+
+def expect(actual, expected, what) -> None:
+    """
+    Raises RuntimeError when a checked result differs from the reference, so the checks also run
+    under python -O
+    """
+    if actual != expected:
+        raise RuntimeError(f'{what}: got {actual!r}, expected {expected!r}')
+
+
+def random_directed(rnd, storage='matrix', max_vertices=12):
+    """
+    parameters:
+        rnd(random.Random): source of randomness
+        storage(str) OPTIONAL: storage mode of the graph
+        max_vertices(int) OPTIONAL: the graph gets between 1 and this many vertices
+
+    returns:
+        DirectedGraph with random edges, all of weight 1 in bitset storage
+    """
+    graph = DirectedGraph(storage=storage)
+    for _ in range(rnd.randint(1, max_vertices)):
+        graph.add_vertex()
+    for _ in range(rnd.randint(0, 3 * graph.v_count)):
+        random_edit(rnd, graph, remove_chance=0)
+    return graph
+
+
+def random_edit(rnd, graph, remove_chance=0.3) -> None:
+    """
+    Adds, reweights or removes one random edge of a DirectedGraph, now and then adds a vertex
+    """
+    src, dst = rnd.randrange(graph.v_count), rnd.randrange(graph.v_count)
+    if rnd.random() < remove_chance:
+        graph.remove_edge(src, dst)
+    elif rnd.random() < 0.05:
+        graph.add_vertex()
+    else:
+        graph.add_edge(src, dst, 1 if graph.storage == 'bitset' else rnd.randint(1, 20))
+
+
+def brute_reachable(graph, src) -> set:
+    """
+    Vertices reachable from src, by a plain BFS over get_edges()
+    """
+    out = {}
+    for u, v, _ in graph.get_edges():
+        out.setdefault(u, []).append(v)
+    seen = {src}
+    queue = deque([src])
+    while queue:
+        for neighbor in out.get(queue.popleft(), []):
+            if neighbor not in seen:
+                seen.add(neighbor)
+                queue.append(neighbor)
+    return seen
+
+
+def check_reachability(rnd, rounds) -> None:
+    """
+    reaches() after every edit, so the incremental closure of _reach_add_edge() and the rebuild
+    after remove_edge() are both covered, against a brute force BFS
+    """
+    for _ in range(rounds):
+        graph = random_directed(rnd)
+        for _ in range(10):
+            for src in range(graph.v_count):
+                reachable = brute_reachable(graph, src)
+                for dst in range(graph.v_count):
+                    expect(graph.reaches(src, dst), dst in reachable, f'reaches({src}, {dst})')
+            random_edit(rnd, graph)
+
+
+def brute_has_cycle(graph) -> bool:
+    """
+    True if some edge u -> v has u reachable back from v
+    """
+    return any(u in brute_reachable(graph, v) for u, v, _ in graph.get_edges())
+
+
+def check_cycles(rnd, rounds) -> None:
+    """
+    has_cycle(), find_cycle() and topological_sort() in every storage mode against a brute force
+    search for an edge closing a cycle: the witness cycle must be a closed path of the graph and the
+    order must put every edge forward
+    """
+    for _ in range(rounds):
+        for storage in DirectedGraph.STORAGE_MODES:
+            graph = random_directed(rnd, storage, max_vertices=8)
+            for _ in range(5):
+                cyclic = brute_has_cycle(graph)
+                expect(graph.has_cycle(), cyclic, f'{storage} has_cycle()')
+
+                cycle = graph.find_cycle()
+                expect(cycle is not None, cyclic, f'{storage} find_cycle() found a cycle')
+                if cycle is not None:
+                    expect(len(cycle) > 2 and cycle[0] == cycle[-1] and graph.is_valid_path(cycle), True,
+                           f'{storage} find_cycle() {cycle} is a closed path')
+
+                order = graph.topological_sort()
+                expect(order is not None, not cyclic, f'{storage} topological_sort() found an order')
+                if order is not None:
+                    expect(sorted(order), graph.get_vertices(), f'{storage} topological_sort() vertices')
+                    position = {vertex: index for index, vertex in enumerate(order)}
+                    expect(all(position[u] < position[v] for u, v, _ in graph.get_edges()), True,
+                           f'{storage} topological_sort() {order} puts every edge forward')
+                random_edit(rnd, graph)
+
+
+def brute_distances(graph, src) -> []:
+    """
+    Shortest distances from src by relaxing every edge until nothing changes (Bellman-Ford)
+    """
+    dist = [float('inf')] * graph.v_count
+    dist[src] = 0
+    edges = graph.get_edges()
+    changed = True
+    while changed:
+        changed = False
+        for u, v, weight in edges:
+            if dist[u] + weight < dist[v]:
+                dist[v] = dist[u] + weight
+                changed = True
+    return dist
+
+
+def check_dijkstra_cache(rnd, rounds) -> None:
+    """
+    dijkstra() against brute force distances after every edit, with dijkstra_cache_cells small
+    enough that the cache keeps evicting: cached answers must follow edits, be copies the caller can
+    change freely, and agree with the predecessors returned alongside them
+    """
+    for _ in range(rounds):
+        for storage in DirectedGraph.STORAGE_MODES:
+            graph = random_directed(rnd, storage)
+            graph.dijkstra_cache_cells = 2 * graph.v_count * rnd.randint(0, 3)
+            for _ in range(5):
+                for src in rnd.sample(range(graph.v_count), graph.v_count):
+                    reference = brute_distances(graph, src)
+                    distances = graph.dijkstra(src)
+                    expect(distances, reference, f'{storage} dijkstra({src})')
+                    distances[src] = -1
+                    expect(graph.dijkstra(src), reference, f'{storage} dijkstra({src}) repeated')
+
+                    dst = rnd.randrange(graph.v_count)
+                    expect(graph.dijkstra(src, dst)[dst], reference[dst], f'{storage} dijkstra({src}, {dst})')
+                    distances, predecessors = graph.dijkstra(src, return_predecessors=True)
+                    path = DirectedGraph.reconstruct_path(predecessors, src, dst)
+                    if reference[dst] == float('inf'):
+                        expect(path, [], f'{storage} path {src} -> {dst}')
+                    else:
+                        expect(graph.is_valid_path(path) and path[0] == src and path[-1] == dst, True,
+                               f'{storage} path {path} from {src} to {dst}')
+                        weights = {(u, v): weight for u, v, weight in graph.get_edges()}
+                        expect(sum(weights[edge] for edge in zip(path, path[1:])), reference[dst],
+                               f'{storage} length of path {path}')
+                random_edit(rnd, graph)
+
+
+def check_all_pairs(rnd, rounds) -> None:
+    """
+    all_pairs_shortest_paths() with and without numpy in every storage mode against brute force
+    distances from each vertex, the finite entries staying python ints like dijkstra() returns
+    """
+    expect(DirectedGraph().all_pairs_shortest_paths(), [], 'all_pairs_shortest_paths() of an empty graph')
+    for _ in range(rounds):
+        for storage in DirectedGraph.STORAGE_MODES:
+            graph = random_directed(rnd, storage)
+            for _ in range(3):
+                reference = [brute_distances(graph, src) for src in range(graph.v_count)]
+                for use_numpy in (True, False):
+                    table = graph.all_pairs_shortest_paths(use_numpy=use_numpy)
+                    expect(table, reference, f'{storage} all_pairs_shortest_paths(use_numpy={use_numpy})')
+                    expect({type(d) for row in table for d in row if d != float('inf')} <= {int}, True,
+                           f'{storage} all_pairs_shortest_paths(use_numpy={use_numpy}) entry types')
+                random_edit(rnd, graph)
+
+
+def brute_depths(neighbors, start) -> dict:
+    """
+    Number of edges on a shortest path from start to every vertex it reaches, neighbors(v) giving
+    the vertices adjacent to v
+    """
+    depth = {start: 0}
+    queue = deque([start])
+    while queue:
+        vertex = queue.popleft()
+        for neighbor in neighbors(vertex):
+            if neighbor not in depth:
+                depth[neighbor] = depth[vertex] + 1
+                queue.append(neighbor)
+    return depth
+
+
+def random_undirected(rnd, max_vertices=10):
+    """
+    parameters:
+        rnd(random.Random): source of randomness
+        max_vertices(int) OPTIONAL: vertex names are drawn from this many letters
+
+    returns:
+        UndirectedGraph with random edges between single letter vertices
+    """
+    labels = 'ABCDEFGHIJKLMNOP'[:rnd.randint(1, max_vertices)]
+    edge_count = rnd.randint(0, 2 * len(labels))
+    return UndirectedGraph([rnd.choice(labels) + rnd.choice(labels) for _ in range(edge_count)])
+
+
+def random_ud_edit(rnd, graph, labels) -> None:
+    """
+    Adds or removes one random edge of an UndirectedGraph, now and then removes or adds a vertex
+    """
+    u, v = rnd.choice(labels), rnd.choice(labels)
+    choice = rnd.random()
+    if choice < 0.4:
+        graph.add_edge(u, v)
+    elif choice < 0.85:
+        graph.remove_edge(u, v)
+    elif choice < 0.95:
+        graph.remove_vertex(u)
+    else:
+        graph.add_vertex(u)
+
+
+def brute_components(graph) -> int:
+    """
+    Number of connected components of an UndirectedGraph, by a BFS from every unseen vertex
+    """
+    seen = set()
+    components = 0
+    for start in graph.adj_list:
+        if start not in seen:
+            components += 1
+            seen.update(brute_depths(graph.adj_list.__getitem__, start))
+    return components
+
+
+def check_components(rnd, rounds) -> None:
+    """
+    count_connected_components() against brute force, queried after a random number of edits so
+    that several removals are pending in the union-find at once, and on a long ring with random
+    chords where the pending checks search far around it and can run out of their shared budget
+    """
+    for _ in range(rounds):
+        graph = random_undirected(rnd)
+        labels = sorted(graph.adj_list) or ['A']
+        for _ in range(15):
+            expect(graph.count_connected_components(), brute_components(graph),
+                   'count_connected_components()')
+            for _ in range(rnd.randint(1, 4)):
+                random_ud_edit(rnd, graph, labels)
+
+    ring = [f'R{index}' for index in range(300)]
+    for _ in range(rounds):
+        graph = UndirectedGraph()
+        for index, vertex in enumerate(ring):
+            graph.add_edge(vertex, ring[index - 1])
+        for _ in range(20):
+            expect(graph.count_connected_components(), brute_components(graph),
+                   'count_connected_components() of the ring')
+            for _ in range(rnd.randint(1, 6)):
+                index = rnd.randrange(len(ring))
+                if rnd.random() < 0.6:
+                    graph.remove_edge(ring[index], ring[index - 1])
+                else:
+                    graph.add_edge(ring[index], rnd.choice(ring))
+
+
+def brute_ud_has_cycle(graph) -> bool:
+    """
+    True if a DFS of an UndirectedGraph meets an already seen vertex other than the one it came from
+    """
+    seen = set()
+    for start in graph.adj_list:
+        if start in seen:
+            continue
+        seen.add(start)
+        stack = [(start, None)]
+        while stack:
+            vertex, parent = stack.pop()
+            for neighbor in graph.adj_list[vertex]:
+                if neighbor == parent:
+                    continue
+                if neighbor in seen:
+                    return True
+                seen.add(neighbor)
+                stack.append((neighbor, vertex))
+    return False
+
+
+def check_ud_has_cycle(rnd, rounds) -> None:
+    """
+    UndirectedGraph.has_cycle() against a brute force back edge search, called after a random
+    number of edits with nothing else asking for the components in between, so the removals pending
+    in the union-find are worked out by has_cycle() itself
+    """
+    for _ in range(rounds):
+        graph = random_undirected(rnd)
+        labels = sorted(graph.adj_list) or ['A']
+        for _ in range(15):
+            expect(graph.has_cycle(), brute_ud_has_cycle(graph), f'has_cycle() of {graph.get_edges()}')
+            for _ in range(rnd.randint(1, 4)):
+                random_ud_edit(rnd, graph, labels)
+
+
+def write_edge_file(rnd, path, rows, delimiter, header) -> None:
+    """
+    Writes rows of fields to path joined by delimiter, with an optional header line and comment and
+    blank lines mixed in
+    """
+    with open(path, 'w') as edge_file:
+        edge_file.write('# random edge list\n')
+        if header:
+            edge_file.write(delimiter.join(['src', 'dst', 'weight'][:len(rows[0]) if rows else 2]) + '\n')
+        for row in rows:
+            if rnd.random() < 0.1:
+                edge_file.write(rnd.choice(['\n', '# comment\n', '   \n']))
+            edge_file.write(delimiter.join(row) + '\n')
+
+
+def check_edge_files(rnd, rounds) -> None:
+    """
+    from_edge_file() of both graph classes against graphs built with add_edge() from the same lines,
+    for whitespace, tab and comma separated files, with a header, duplicate edges, loops and
+    invalid weights, read in chunks small enough that the edges span several of them
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        for _ in range(rounds):
+            delimiter, suffix = rnd.choice([(' ', '.txt'), ('\t', '.tsv'), (',', '.csv')])
+            header = rnd.random() < 0.5
+            path = os.path.join(directory, 'edges' + suffix)
+            given = dict(delimiter='\t') if delimiter == '\t' and rnd.random() < 0.5 else {}
+            chunk_size = rnd.choice([16, 64, 1 << 20])
+
+            for storage in DirectedGraph.STORAGE_MODES:
+                rows = []
+                for _ in range(rnd.randint(0, 40)):
+                    row = [str(rnd.randint(0, 12)), str(rnd.randint(0, 12))]
+                    if storage != 'bitset' and rnd.random() < 0.8:
+                        row.append(str(rnd.randint(-2, 20)))
+                    rows.append(row)
+                write_edge_file(rnd, path, rows, delimiter, header)
+
+                loaded = []
+                graph = DirectedGraph.from_edge_file(
+                    path, storage, header=header, chunk_size=chunk_size,
+                    progress=lambda edges, rate: loaded.append(edges), **given)
+                # lines add_edge() would ignore do not make vertices either
+                edges = [(int(row[0]), int(row[1]), int(row[2]) if len(row) > 2 else 1) for row in rows]
+                edges = [(src, dst, weight) for src, dst, weight in edges if src != dst and weight > 0]
+                reference = DirectedGraph(storage=storage)
+                for _ in range(max([max(src, dst) for src, dst, _ in edges], default=-1) + 1):
+                    reference.add_vertex()
+                for src, dst, weight in edges:
+                    reference.add_edge(src, dst, weight)
+                expect(graph.v_count, reference.v_count, f'{storage} from_edge_file() v_count')
+                expect(graph.get_edges(), reference.get_edges(), f'{storage} from_edge_file() edges')
+                expect(loaded[-1:], [len(edges)], f'{storage} from_edge_file() progress')
+
+            rows = [[f'v{rnd.randint(0, 9)}', f'v{rnd.randint(0, 9)}'] for _ in range(rnd.randint(0, 30))]
+            write_edge_file(rnd, path, rows, delimiter, header)
+            graph = UndirectedGraph.from_edge_file(path, header=header, chunk_size=chunk_size, **given)
+            reference = UndirectedGraph()
+            for u, v in rows:
+                reference.add_edge(u, v)
+            expect(graph.get_vertices(), reference.get_vertices(),
+                   'UndirectedGraph.from_edge_file() vertices')
+            expect(graph.get_edges(), reference.get_edges(), 'UndirectedGraph.from_edge_file() edges')
+            for start in graph.get_vertices():
+                expect(graph.dfs(start), reference.dfs(start),
+                       f'UndirectedGraph.from_edge_file() dfs({start!r})')
+                expect(graph.bfs(start), reference.bfs(start),
+                       f'UndirectedGraph.from_edge_file() bfs({start!r})')
+            expect(graph.count_connected_components(), reference.count_connected_components(),
+                   'UndirectedGraph.from_edge_file() count_connected_components()')
+
+
+def snapshot_corruptions(rnd, data: bytes) -> dict:
+    """
+    parameters:
+        rnd(random.Random): source of randomness
+        data(bytes): snapshot written by DirectedGraph.save() on this machine
+
+    returns:
+        dict from a description of the damage to a damaged copy of data, one per kind of damage
+        load() has to reject that this snapshot can carry
+    """
+    header_size = DirectedGraph.SNAPSHOT_HEADER.size
+    v_count, e_count = DirectedGraph.SNAPSHOT_HEADER.unpack(data[:header_size])[-2:]
+    body = array('q')
+    body.frombytes(data[header_size:])
+    offsets = body[:v_count + 1]
+    targets, weights = v_count + 1, v_count + 1 + e_count
+
+    damaged = {'truncated file': data[:-8], 'wrong magic': b'X' + data[1:]}
+
+    def damage(what, position, value):
+        copy = array('q', body)
+        copy[position] = value
+        damaged[what] = data[:header_size] + copy.tobytes()
+
+    if e_count:
+        edge = rnd.randrange(e_count)
+        damage('target past the last vertex', targets + edge, v_count + rnd.randint(0, 5))
+        damage('negative target', targets + edge, -1)
+        damage('zero weight', weights + edge, 0)
+    if v_count > 1:
+        vertex = rnd.randint(1, v_count - 1)
+        damage('decreasing offsets', vertex, offsets[vertex + 1] + 1)
+    for vertex in range(v_count):
+        if offsets[vertex + 1] - offsets[vertex] > 1:
+            first = targets + offsets[vertex]
+            damage('row not ascending', first, body[first + 1])
+            break
+    return damaged
+
+
+def check_snapshots(rnd, rounds) -> None:
+    """
+    save()/load() round trips in every storage mode, mapped and read, and damaged snapshots (short,
+    not a snapshot, targets out of range, decreasing offsets, bad weights, unsorted rows) raising
+    ValueError in both load modes
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'graph.snap')
+        for _ in range(rounds):
+            for storage in DirectedGraph.STORAGE_MODES:
+                graph = random_directed(rnd, storage)
+                graph.save(path)
+                for mmap in (True, False):
+                    loaded = DirectedGraph.load(path, mmap=mmap)
+                    expect(loaded.storage, 'csr' if mmap else storage,
+                           f'{storage} snapshot storage, mmap={mmap}')
+                    expect(loaded.v_count, graph.v_count, f'{storage} snapshot v_count, mmap={mmap}')
+                    expect(loaded.get_edges(), graph.get_edges(), f'{storage} snapshot edges, mmap={mmap}')
+                    expect([loaded.dfs(v) for v in range(loaded.v_count)],
+                           [graph.dfs(v) for v in range(graph.v_count)],
+                           f'{storage} snapshot dfs, mmap={mmap}')
+                    expect([loaded.dijkstra(v) for v in range(loaded.v_count)],
+                           [graph.dijkstra(v) for v in range(graph.v_count)],
+                           f'{storage} snapshot dijkstra, mmap={mmap}')
+                    del loaded
+
+                with open(path, 'rb') as snapshot:
+                    data = snapshot.read()
+                for what, damaged in snapshot_corruptions(rnd, data).items():
+                    with open(path, 'wb') as snapshot:
+                        snapshot.write(damaged)
+                    for mmap in (True, False):
+                        try:
+                            DirectedGraph.load(path, mmap=mmap)
+                        except ValueError:
+                            pass
+                        else:
+                            raise RuntimeError(f'{storage} snapshot with {what} loaded without error, '
+                                               f'mmap={mmap}')
+
+
+def ud_reference_dfs(graph, v_start, v_end=None) -> []:
+    """
+    The original UndirectedGraph.dfs(): list membership for visited and a sort per pop
+    """
+    to_visit_stack = [v_start] if v_start in graph.adj_list else []
+    visited_stack = []
+    while to_visit_stack:
+        curr_vertex = to_visit_stack.pop()
+        if curr_vertex not in visited_stack:
+            visited_stack.append(curr_vertex)
+            if curr_vertex == v_end:
+                return visited_stack
+            to_visit_stack.extend(sorted(graph.adj_list[curr_vertex], reverse=True))
+    return visited_stack
+
+
+def ud_reference_bfs(graph, v_start, v_end=None) -> []:
+    """
+    The original UndirectedGraph.bfs(): list membership for visited and a sort per dequeue
+    """
+    to_visit_queue = [v_start] if v_start in graph.adj_list else []
+    visited_stack = []
+    while to_visit_queue:
+        curr_vertex = to_visit_queue.pop(0)
+        if curr_vertex not in visited_stack:
+            visited_stack.append(curr_vertex)
+            if curr_vertex == v_end:
+                return visited_stack
+            to_visit_queue.extend(sorted(graph.adj_list[curr_vertex]))
+    return visited_stack
+
+
+def check_ud_traversals(rnd, rounds) -> None:
+    """
+    UndirectedGraph.dfs()/bfs() on the interned neighbor ids against the original versions after
+    every edit, the edits including vertex removals (so ids are freed and handed out again) and
+    batches of edges through _bulk_add_edges()
+    """
+    for _ in range(rounds):
+        graph = random_undirected(rnd)
+        labels = sorted(graph.adj_list) or ['A']
+        for _ in range(15):
+            for start in labels + ['?']:
+                end = rnd.choice(labels)
+                expect(graph.dfs(start), ud_reference_dfs(graph, start), f'dfs({start!r})')
+                expect(graph.bfs(start), ud_reference_bfs(graph, start), f'bfs({start!r})')
+                expect(graph.dfs(start, end), ud_reference_dfs(graph, start, end), f'dfs({start!r}, {end!r})')
+                expect(graph.bfs(start, end), ud_reference_bfs(graph, start, end), f'bfs({start!r}, {end!r})')
+            if rnd.random() < 0.2:
+                edges = [(rnd.choice(labels), rnd.choice(labels)) for _ in range(rnd.randint(0, 6))]
+                graph._bulk_add_edges(edges)
+            else:
+                random_ud_edit(rnd, graph, labels)
+
+
+def until(order: [], stop_when) -> []:
+    """
+    Prefix of order up to and including the first vertex stop_when is true for
+    """
+    for index, vertex in enumerate(order):
+        if stop_when(vertex):
+            return order[:index + 1]
+    return order
+
+
+def check_lazy_traversals(rnd, rounds) -> None:
+    """
+    iter_dfs()/iter_bfs() on both graph classes, every storage mode for DirectedGraph: the same order
+    as dfs()/bfs() with and without v_end, the prefix up to the first match with stop_when, and
+    with max_depth each vertex within max_depth edges once, iter_bfs() still in bfs() order
+    """
+    for _ in range(rounds):
+        graphs = [(random_directed(rnd, storage), None) for storage in DirectedGraph.STORAGE_MODES]
+        ud_graph = random_undirected(rnd)
+        graphs.append((ud_graph, ud_graph.adj_list.__getitem__))
+        for graph, neighbors in graphs:
+            vertices = graph.get_vertices()
+            for start in vertices:
+                end = rnd.choice(vertices)
+                stop = set(rnd.sample(vertices, rnd.randint(0, len(vertices))))
+                dfs_order, bfs_order = graph.dfs(start), graph.bfs(start)
+                expect(list(graph.iter_dfs(start)), dfs_order, f'iter_dfs({start!r})')
+                expect(list(graph.iter_bfs(start)), bfs_order, f'iter_bfs({start!r})')
+                expect(list(graph.iter_dfs(start, end)), graph.dfs(start, end),
+                       f'iter_dfs({start!r}, {end!r})')
+                expect(list(graph.iter_bfs(start, end)), graph.bfs(start, end),
+                       f'iter_bfs({start!r}, {end!r})')
+                expect(list(graph.iter_dfs(start, stop_when=stop.__contains__)),
+                       until(dfs_order, stop.__contains__), f'iter_dfs({start!r}, stop_when={sorted(stop)})')
+                expect(list(graph.iter_bfs(start, stop_when=stop.__contains__)),
+                       until(bfs_order, stop.__contains__), f'iter_bfs({start!r}, stop_when={sorted(stop)})')
+
+                depths = brute_depths(neighbors or graph.neighbors, start)
+                for max_depth in range(4):
+                    within = {v for v, depth in depths.items() if depth <= max_depth}
+                    limited = list(graph.iter_dfs(start, max_depth=max_depth))
+                    expect((len(limited), set(limited)), (len(within), within),
+                           f'iter_dfs({start!r}, max_depth={max_depth})')
+                    expect(list(graph.iter_bfs(start, max_depth=max_depth)), bfs_order[:len(within)],
+                           f'iter_bfs({start!r}, max_depth={max_depth})')
+
+
+def check_multi_source_bfs(rnd, rounds) -> None:
+    """
+    multi_source_bfs() with and without numpy in every storage mode against a brute force BFS per
+    source, with sources outside the graph, repeated sources and more than one 64 source batch:
+    distance() before and after the dicts are decoded, indexing from either end and IndexError
+    past it
+    """
+    for _ in range(rounds):
+        for storage in DirectedGraph.STORAGE_MODES:
+            graph = random_directed(rnd, storage)
+            sources = [rnd.randint(-1, graph.v_count) for _ in range(rnd.choice([1, 5, 64, 65, 150]))]
+            reference = [brute_depths(graph.neighbors, source) if 0 <= source < graph.v_count else {}
+                         for source in sources]
+            for use_numpy in (True, False):
+                what = f'{storage} multi_source_bfs(use_numpy={use_numpy})'
+                result = graph.multi_source_bfs(sources, use_numpy=use_numpy)
+                expect(len(result), len(sources), f'{what} length')
+                for _ in range(20):
+                    index, vertex = rnd.randrange(len(sources)), rnd.randint(-1, graph.v_count)
+                    expect(result.distance(index, vertex), reference[index].get(vertex),
+                           f'{what} distance({index}, {vertex})')
+                expect(result[-1], reference[-1], f'{what}[-1]')
+                expect(list(result), reference, f'{what} dicts')
+                index, vertex = rnd.randrange(len(sources)), rnd.randrange(graph.v_count)
+                expect(result.distance(index, vertex), reference[index].get(vertex),
+                       f'{what} distance({index}, {vertex}) once decoded')
+                try:
+                    result[len(sources)]
+                except IndexError:
+                    pass
+                else:
+                    raise RuntimeError(f'{what}[{len(sources)}] did not raise IndexError')
+
+
+def check_strong_components(rnd, rounds) -> None:
+    """
+    strongly_connected_components() and condensation() in every storage mode against brute force
+    mutual reachability: the components, their topological order, and a condensation holding one
+    edge of the lightest weight per pair of components joined by some edge
+    """
+    for _ in range(rounds):
+        for storage in DirectedGraph.STORAGE_MODES:
+            graph = random_directed(rnd, storage)
+            for _ in range(5):
+                reachable = [brute_reachable(graph, v) for v in range(graph.v_count)]
+                expected = sorted({tuple(sorted(u for u in reachable[v] if v in reachable[u]))
+                                   for v in range(graph.v_count)})
+                components = graph.strongly_connected_components()
+                expect(sorted(tuple(sorted(component)) for component in components), expected,
+                       f'{storage} strongly_connected_components()')
+                expect(all(component == sorted(component) for component in components), True,
+                       f'{storage} strongly_connected_components() {components} ascending')
+
+                dag, component_of = graph.condensation()
+                index_of = {v: index for index, component in enumerate(components) for v in component}
+                expect(component_of, [index_of[v] for v in range(graph.v_count)],
+                       f'{storage} condensation() component_of')
+                lightest = {}
+                for u, v, weight in graph.get_edges():
+                    key = (component_of[u], component_of[v])
+                    if key[0] != key[1]:
+                        lightest[key] = min(weight, lightest.get(key, weight))
+                expect((dag.storage, dag.v_count), (storage, len(components)),
+                       f'{storage} condensation() vertices')
+                expect(dag.get_edges(), sorted((u, v, weight) for (u, v), weight in lightest.items()),
+                       f'{storage} condensation() edges')
+                expect(all(u < v for u, v, _ in dag.get_edges()), True,
+                       f'{storage} condensation() edges follow the topological order')
+                random_edit(rnd, graph)
+
+
+def check_ud_shortest_path(rnd, rounds) -> None:
+    """
+    UndirectedGraph.shortest_path() for every pair of vertices, and a vertex outside the graph, after
+    every edit: a valid path between the two of as many edges as a brute force BFS finds, empty
+    when there is none
+    """
+    for _ in range(rounds):
+        graph = random_undirected(rnd, max_vertices=16)
+        labels = sorted(graph.adj_list) or ['A']
+        for _ in range(10):
+            vertices = graph.get_vertices()
+            for u in vertices + ['?']:
+                depths = brute_depths(graph.adj_list.__getitem__, u) if u in graph.adj_list else {}
+                for v in vertices + ['?']:
+                    path = graph.shortest_path(u, v)
+                    if v not in depths:
+                        expect(path, [], f'shortest_path({u!r}, {v!r})')
+                        continue
+                    expect((len(path) - 1, path[:1], path[-1:]), (depths[v], [u], [v]),
+                           f'shortest_path({u!r}, {v!r}) = {path}, length and ends')
+                    expect(graph.is_valid_path(path), True, f'shortest_path({u!r}, {v!r}) = {path} is a path')
+            random_ud_edit(rnd, graph, labels)
+
+
+def check_shortest_paths(rnd, rounds) -> None:
+    """
+    DirectedGraph.shortest_path() with every method in every storage mode against brute force
+    distances: same distance, and a path of exactly that length between the two vertices. A* runs
+    with an admissible heuristic (a random fraction of the true remaining distance) and with a zero
+    one, and vertices outside the graph or a bad method name are handled as documented
+    """
+    for _ in range(rounds):
+        for storage in DirectedGraph.STORAGE_MODES:
+            graph = random_directed(rnd, storage, max_vertices=8)
+            for _ in range(3):
+                table = [brute_distances(graph, src) for src in range(graph.v_count)]
+                weights = {(u, v): weight for u, v, weight in graph.get_edges()}
+                fraction = rnd.random()
+
+                def admissible(vertex, target):
+                    remaining = table[vertex][target]
+                    return int(remaining * fraction) if remaining != float('inf') else 0
+
+                methods = (('bidirectional', None), ('astar', admissible),
+                           ('astar', lambda vertex, target: 0), ('dijkstra', None),
+                           (None, None), (None, admissible))
+                for src in range(-1, graph.v_count + 1):
+                    for dst in range(-1, graph.v_count + 1):
+                        valid = 0 <= src < graph.v_count and 0 <= dst < graph.v_count
+                        distance = table[src][dst] if valid else float('inf')
+                        for method, heuristic in methods:
+                            result = graph.shortest_path(src, dst, heuristic, method)
+                            what = f'{storage} shortest_path({src}, {dst}, method={method!r})'
+                            expect(result.distance, distance, what)
+                            if distance == float('inf'):
+                                expect(result.path, [], what + ' path')
+                                continue
+                            expect((result.path[0], result.path[-1]), (src, dst), what + ' ends')
+                            expect(sum(weights[hop] for hop in zip(result.path, result.path[1:])), distance,
+                                   f'{what} length of {result.path}')
+                random_edit(rnd, graph)
+
+            # src == dst is answered before the method is looked at
+            for method, heuristic in (('astar', None), ('fastest', None)) if graph.v_count > 1 else ():
+                try:
+                    graph.shortest_path(0, graph.v_count - 1, heuristic, method)
+                except ValueError:
+                    pass
+                else:
+                    raise RuntimeError(f'{storage} shortest_path(method={method!r}) did not raise ValueError')
+
+
+def check_dijkstra_many(rnd, rounds) -> None:
+    """
+    dijkstra_many() in this process and over two worker processes, with several batch sizes and in
+    every storage mode, against dijkstra() per source: the same (src, distances) pairs in any order,
+    also after closing the generator part way. Starting worker pools is slow, so this runs one
+    graph for every ten rounds
+    """
+    for _ in range(max(1, rounds // 10)):
+        for storage in DirectedGraph.STORAGE_MODES:
+            graph = random_directed(rnd, storage, max_vertices=30)
+            sources = [rnd.randrange(graph.v_count) for _ in range(rnd.randint(0, 12))]
+            reference = sorted((src, graph.dijkstra(src)) for src in sources)
+            for workers, batch_size in ((1, None), (2, None), (2, 1), (2, 5)):
+                what = f'{storage} dijkstra_many(workers={workers}, batch_size={batch_size})'
+                expect(sorted(graph.dijkstra_many(sources, workers, batch_size)), reference, what)
+
+                results = graph.dijkstra_many(sources, workers, batch_size)
+                first = next(results, None)
+                results.close()
+                if first is not None:
+                    expect(first in reference, True, what + ' first result')
+            expect(sorted(graph.dijkstra_many(sources, 2)), reference,
+                   f'{storage} dijkstra_many() after a close')
+
+
+def check_stats_hook(rnd, rounds) -> None:
+    """
+    stats_hook with a StatsRecorder on both graph classes: every dfs(), bfs(), has_cycle() and
+    dijkstra() call gives the same result as without the hook and records one CallStats for its
+    method, whose counters agree with the result (vertices visited or settled, the edges of the
+    vertices expanded, heap operations, all 0 for a cached dijkstra())
+    """
+    def recorded(graph, method, *args):
+        recorder = graph.stats_hook = StatsRecorder(limit=1)
+        result = getattr(graph, method)(*args)
+        graph.stats_hook = None
+        expect(result, getattr(graph, method)(*args), f'{method}{args} with stats_hook')
+        expect((len(recorder.calls), recorder.last.method), (1, method), f'{method}{args} recorded calls')
+        expect(recorder.last.wall_time >= 0, True, f'{method}{args} wall_time')
+        return result, recorder.last
+
+    for _ in range(rounds):
+        for storage in DirectedGraph.STORAGE_MODES:
+            graph = random_directed(rnd, storage)
+            graph.dijkstra_cache_size = 0
+            out_degree = [len(graph.neighbors(v)) for v in range(graph.v_count)]
+            for start in range(graph.v_count):
+                for method in ('dfs', 'bfs'):
+                    visited, stats = recorded(graph, method, start)
+                    expect((stats.vertices_settled, stats.edges_relaxed, stats.heap_pushes, stats.heap_pops),
+                           (len(visited), sum(out_degree[v] for v in visited), 0, 0),
+                           f'{storage} {method}({start}) counters')
+                    expect(1 <= stats.peak_frontier <= 1 + graph.edge_count(), True,
+                           f'{storage} {method}({start}) peak_frontier')
+
+                distances, stats = recorded(graph, 'dijkstra', start)
+                settled = [v for v in range(graph.v_count) if distances[v] != float('inf')]
+                expect((stats.vertices_settled, stats.edges_relaxed),
+                       (len(settled), sum(out_degree[v] for v in settled)),
+                       f'{storage} dijkstra({start}) counters')
+                expect(len(settled) <= stats.heap_pops <= stats.heap_pushes <= 1 + stats.edges_relaxed, True,
+                       f'{storage} dijkstra({start}) heap counters {stats}')
+
+            _, stats = recorded(graph, 'has_cycle')
+            expect(stats.vertices_settled <= graph.v_count, True, f'{storage} has_cycle() counters {stats}')
+
+            graph.dijkstra_cache_size = 128
+            graph.dijkstra(0)
+            _, stats = recorded(graph, 'dijkstra', 0)
+            expect([getattr(stats, field) for field in CallStats.FIELDS[:-1]], [0] * 5,
+                   f'{storage} cached dijkstra(0) counters')
+
+        ud_graph = random_undirected(rnd)
+        for start in sorted(ud_graph.adj_list) + ['?']:
+            end = rnd.choice(sorted(ud_graph.adj_list) or ['A'])
+            for method in ('dfs', 'bfs'):
+                for args in ((start,), (start, end)):
+                    visited, stats = recorded(ud_graph, method, *args)
+                    # the ending vertex is visited but not expanded
+                    expanded = visited[:-1] if len(args) > 1 and visited[-1:] == [end] else visited
+                    expect((stats.vertices_settled, stats.edges_relaxed),
+                           (len(visited), sum(len(ud_graph.adj_list[v]) for v in expanded)),
+                           f'UndirectedGraph {method}{args} counters')
+        _, stats = recorded(ud_graph, 'has_cycle')
+        expect(stats.vertices_settled <= len(ud_graph.adj_list), True,
+               f'UndirectedGraph has_cycle() counters {stats}')
+
+
+def check_storage_modes(rnd, rounds) -> None:
+    """
+    The same edits applied to a matrix baseline and to a graph of every storage mode: same edges,
+    neighbors and is_valid_path(), and dfs()/bfs() as the baseline legacy_dfs()/legacy_bfs(). Bitset
+    storage raises ValueError for weights other than 1 and is left unchanged by them
+    """
+    for _ in range(rounds):
+        edges = random_directed(rnd, 'bitset').get_edges()
+        v_count = max([max(u, v) for u, v, _ in edges], default=0) + 1
+        for storage in DirectedGraph.STORAGE_MODES:
+            baseline = DirectedGraph(storage='matrix')
+            graph = DirectedGraph(storage=storage)
+            for _ in range(v_count):
+                baseline.add_vertex()
+                graph.add_vertex()
+            for u, v, weight in edges:
+                baseline.add_edge(u, v, weight)
+                graph.add_edge(u, v, weight)
+
+            for _ in range(5):
+                expect(graph.get_edges(), baseline.get_edges(), f'{storage} get_edges()')
+                path = [rnd.randrange(graph.v_count) for _ in range(rnd.randint(0, 4))]
+                expect(graph.is_valid_path(path), baseline.is_valid_path(path),
+                       f'{storage} is_valid_path({path})')
+                for src in range(graph.v_count):
+                    dst = rnd.randrange(graph.v_count)
+                    expect(graph.neighbors(src), baseline.neighbors(src), f'{storage} neighbors({src})')
+                    expect(graph.dfs(src), legacy_dfs(baseline, src), f'{storage} dfs({src})')
+                    expect(graph.bfs(src), legacy_bfs(baseline, src), f'{storage} bfs({src})')
+                    expect(graph.dfs(src, dst), legacy_dfs(baseline, src, dst),
+                           f'{storage} dfs({src}, {dst})')
+                    expect(graph.bfs(src, dst), legacy_bfs(baseline, src, dst),
+                           f'{storage} bfs({src}, {dst})')
+
+                src, dst = rnd.randrange(graph.v_count), rnd.randrange(graph.v_count)
+                if rnd.random() < 0.4:
+                    baseline.remove_edge(src, dst)
+                    graph.remove_edge(src, dst)
+                elif rnd.random() < 0.1:
+                    baseline.add_vertex()
+                    graph.add_vertex()
+                else:
+                    baseline.add_edge(src, dst)
+                    graph.add_edge(src, dst)
+
+            if storage == 'bitset' and graph.v_count > 1:
+                before = graph.get_edges()
+                for sources, targets, weights in (([0], [1], [2]), ([1, 0], [0, 1], [1, 3])):
+                    try:
+                        if len(sources) == 1:
+                            graph.add_edge(sources[0], targets[0], weights[0])
+                        else:
+                            graph._bulk_add_edges(sources, targets, weights)
+                    except ValueError:
+                        pass
+                    else:
+                        raise RuntimeError('bitset storage took an edge of weight other than 1')
+                expect(graph.get_edges(), before, 'bitset edges after a rejected weight')
+
+
+def check_edge_index(rnd, rounds) -> None:
+    """
+    get_edges(), edge_count(), neighbors() and in_neighbors() in every storage mode after every
+    edit (reweights, removals of missing edges and batches through _bulk_add_edges() included)
+    against each other, and for matrix storage against a walk over every cell of adj_matrix. The
+    returned lists are copies the caller may change
+    """
+    for _ in range(rounds):
+        for storage in DirectedGraph.STORAGE_MODES:
+            graph = random_directed(rnd, storage)
+            for _ in range(10):
+                edges = graph.get_edges()
+                if storage == 'matrix':
+                    expect(edges, [(u, v, graph.adj_matrix[u][v]) for u in range(graph.v_count)
+                                   for v in range(graph.v_count) if graph.adj_matrix[u][v]],
+                           'matrix get_edges() against adj_matrix')
+                expect(edges, sorted(edges), f'{storage} get_edges() order')
+                expect(graph.edge_count(), len(edges), f'{storage} edge_count()')
+                for v in range(-1, graph.v_count + 1):
+                    expect(graph.neighbors(v), [dst for src, dst, _ in edges if src == v],
+                           f'{storage} neighbors({v})')
+                    expect(graph.in_neighbors(v), sorted(src for src, dst, _ in edges if dst == v),
+                           f'{storage} in_neighbors({v})')
+                if graph.v_count:
+                    graph.neighbors(0).append(-1)
+                    graph.in_neighbors(0).append(-1)
+                    expect(graph.get_edges(), edges, f'{storage} get_edges() after changing returned lists')
+
+                if rnd.random() < 0.2:
+                    pairs = [(rnd.randrange(graph.v_count), rnd.randrange(graph.v_count))
+                             for _ in range(rnd.randint(0, 6))]
+                    pairs = [(src, dst) for src, dst in pairs if src != dst]
+                    weights = [1 if storage == 'bitset' else rnd.randint(1, 20) for _ in pairs]
+                    graph._bulk_add_edges([src for src, _ in pairs], [dst for _, dst in pairs], weights)
+                else:
+                    random_edit(rnd, graph, remove_chance=0.4)
+
+
+def check_validate_paths(rnd, rounds) -> None:
+    """
+    validate_paths() with and without numpy against is_valid_path(), on both graph classes and every
+    storage mode, given as lists of paths and as a flat sequence with offsets, after edits so the
+    cached edge keys are dropped in time. Every tenth round also runs two worker processes
+    """
+    for round_index in range(rounds):
+        graphs = [random_directed(rnd, storage) for storage in DirectedGraph.STORAGE_MODES]
+        ud_graph = random_undirected(rnd)
+        labels = sorted(ud_graph.adj_list) + ['?']
+        for _ in range(5):
+            batches = [(f'{graph.storage} validate_paths()',
+                        graph, [[rnd.randrange(-1, graph.v_count + 1) for _ in range(rnd.randint(0, 4))]
+                                for _ in range(20)]) for graph in graphs]
+            batches.append(('UndirectedGraph validate_paths()',
+                            ud_graph, [[rnd.choice(labels) for _ in range(rnd.randint(0, 4))]
+                                       for _ in range(20)]))
+            for what, graph, paths in batches:
+                reference = [graph.is_valid_path(path) for path in paths]
+                flat = [vertex for path in paths for vertex in path]
+                offsets = [0]
+                for path in paths:
+                    offsets.append(offsets[-1] + len(path))
+                for use_numpy in (True, False):
+                    expect(list(graph.validate_paths(paths, use_numpy=use_numpy)), reference,
+                           f'{what} use_numpy={use_numpy}')
+                    expect(list(graph.validate_paths(flat, offsets, use_numpy=use_numpy)), reference,
+                           f'{what} flat, use_numpy={use_numpy}')
+                if round_index % 10 == 0:
+                    expect(list(graph.validate_paths(paths, workers=2)), reference, f'{what} workers=2')
+            for graph in graphs:
+                random_edit(rnd, graph)
+            random_ud_edit(rnd, ud_graph, labels[:-1] or ['A'])
+
+
+CHECKS = {
+    'reachability': check_reachability,
+    'cycles': check_cycles,
+    'dijkstra_cache': check_dijkstra_cache,
+    'all_pairs': check_all_pairs,
+    'components': check_components,
+    'ud_has_cycle': check_ud_has_cycle,
+    'edge_files': check_edge_files,
+    'snapshots': check_snapshots,
+    'ud_traversals': check_ud_traversals,
+    'lazy_traversals': check_lazy_traversals,
+    'multi_source_bfs': check_multi_source_bfs,
+    'scc': check_strong_components,
+    'ud_shortest_path': check_ud_shortest_path,
+    'shortest_paths': check_shortest_paths,
+    'dijkstra_many': check_dijkstra_many,
+    'stats_hook': check_stats_hook,
+    'storage_modes': check_storage_modes,
+    'edge_index': check_edge_index,
+    'validate_paths': check_validate_paths,
+}
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='randomized regression checks for the graph classes')
+    parser.add_argument('--rounds', type=int, default=50, help='random graphs per check')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--checks', nargs='+', choices=sorted(CHECKS), default=list(CHECKS))
+    args = parser.parse_args()
+
+    failed = 0
+    for name in args.checks:
+        try:
+            CHECKS[name](random.Random(args.seed), args.rounds)
+        except RuntimeError as error:
+            failed += 1
+            print(f'{name:<16} FAILED  {error}')
+        else:
+            print(f'{name:<16} ok')
+    sys.exit(1 if failed else 0)
@@ -3,6 +3,13 @@
 # Assignment: 
 # Description:
 
+from array import array
+from collections import deque
+
+from edge_files import LoadProgress, read_edge_chunks
+from graph_stats import CallStats, counted_append
+from path_batches import flatten_paths, numpy_used, validate_flat_paths
+
 
 class UndirectedGraph:
     """
@@ -11,15 +18,53 @@ class UndirectedGraph:
     - loops not allowed
     - no edge weights
     - vertex names are strings
+
+    adj_list maps each vertex to a dict whose keys are its neighbors (values unused), which keeps
+    neighbors in insertion order like a list while making membership tests and removals O(1)
+
+    Connected components are tracked with a union-find structure updated by every edit, see
+    count_connected_components()
+
+    Every vertex is also interned as an int id with its neighbor ids in an array('i') kept in
+    name order, updated by every edit like adj_list is. Traversals run on the ids and only
+    translate them back to names for the result
     """
 
+    # callable receiving a graph_stats.CallStats after every dfs(), bfs() and has_cycle() call, e.g.
+    # a graph_stats.StatsRecorder. None (default) turns counting off; can be set per instance
+    stats_hook = None
+
     def __init__(self, start_edges=None):
         """
         Store graph info as adjacency list
-        DO NOT CHANGE THIS METHOD IN ANY WAY
         """
         self.adj_list = dict()
 
+        # union-find over the vertices: parent pointers, set sizes (valid for roots only) and the
+        # number of sets. Edge removals cannot be undone in a union-find, so remove_edge() only
+        # records the removed edge as suspect and the next count_connected_components() checks
+        # whether it split a component; a stale union-find is rebuilt there
+        self._parent = {}
+        self._set_size = {}
+        self._component_count = 0
+        self._components_stale = False
+        self._removed_edges = []
+
+        # number of edges, kept by add_edge()/remove_edge()/remove_vertex() for has_cycle()
+        self._edge_count = 0
+
+        # interned vertices: name -> id, id -> name (None for a freed id), and per id the neighbor ids
+        # sorted by neighbor name, so traversals need no sorting. Ids of removed vertices are reused
+        self._vertex_ids = {}
+        self._labels = []
+        self._neighbor_ids = []
+        self._free_ids = []
+
+        # ascending u * V + v over the vertex ids of every edge, both directions, for validate_paths(),
+        # see _edge_keys(); the keys as a set for checking paths without numpy
+        self._edge_key_cache = None
+        self._edge_key_set_cache = None
+
         # populate graph with initial vertices and edges (if provided)
         # before using, implement add_vertex() and add_edge() methods
         if start_edges is not None:
@@ -29,9 +74,8 @@ class UndirectedGraph:
     def __str__(self):
         """
         Return content of the graph in human-readable form
-        DO NOT CHANGE THIS METHOD IN ANY WAY
         """
-        out = [f'{v}: {self.adj_list[v]}' for v in self.adj_list]
+        out = [f'{v}: {list(self.adj_list[v])}' for v in self.adj_list]
         out = '\n  '.join(out)
         if len(out) < 70:
             out = out.replace('\n  ', ', ')
@@ -52,8 +96,136 @@ class UndirectedGraph:
             adds specified vertex to graph if not existing there already
         """
         if v not in self.adj_list:
-            self.adj_list[v] = []
+            self._graph_changed()
+            self.adj_list[v] = {}
+            if self._free_ids:
+                vertex_id = self._free_ids.pop()
+                self._labels[vertex_id] = v
+            else:
+                vertex_id = len(self._labels)
+                self._labels.append(v)
+                self._neighbor_ids.append(array('i'))
+            self._vertex_ids[v] = vertex_id
+            self._parent[v] = v
+            self._set_size[v] = 1
+            self._component_count += 1
+
+
+    @classmethod
+    def from_edge_file(cls, path, delimiter=None, header=False, chunk_size=1 << 20, progress=None):
+        """
+        parameters:
+            path(str): edge list file with one 'u v' line per edge
+            delimiter(str) OPTIONAL: field separator, see edge_files.read_edge_chunks()
+            header(bool) OPTIONAL: whether the first line is a header to skip
+            chunk_size(int) OPTIONAL: approximate number of bytes parsed at a time
+            progress(callable) OPTIONAL: called as progress(edges_loaded, edges_per_second)
+                after every chunk
+
+        returns:
+            new UndirectedGraph holding the edges of the file
+
+        functionality:
+            streams the file once and inserts each chunk of edges with _bulk_add_edges(), so at most
+            one chunk of lines is in memory next to the graph itself
+        """
+        graph = cls()
+        loaded = LoadProgress(progress)
+
+        for rows in read_edge_chunks(path, delimiter, header, chunk_size):
+            loaded.update(graph._bulk_add_edges((row[0], row[1]) for row in rows))
+
+        return graph
+
+    def _bulk_add_edges(self, edges) -> int:
+        """
+        parameters:
+            edges(iterable): (u, v) pairs
+
+        returns:
+            number of edges that were new to the graph
+
+        functionality:
+            same result as add_edge() on each pair, but the union-find is left to be rebuilt once by
+            the next count_connected_components() instead of being updated per edge, and the neighbor
+            ids of the touched vertices are appended as they come and put in name order once at the end
+        """
+        adj_list = self.adj_list
+        vertex_ids = self._vertex_ids
+        neighbor_ids = self._neighbor_ids
+        touched = set()
+        added = 0
+
+        for u, v in edges:
+            if u == v:
+                continue
+            if u not in adj_list:
+                self.add_vertex(u)
+            if v not in adj_list:
+                self.add_vertex(v)
+            u_neighbors = adj_list[u]
+            if v not in u_neighbors:
+                u_neighbors[v] = None
+                adj_list[v][u] = None
+                u_id, v_id = vertex_ids[u], vertex_ids[v]
+                neighbor_ids[u_id].append(v_id)
+                neighbor_ids[v_id].append(u_id)
+                touched.add(u_id)
+                touched.add(v_id)
+                added += 1
+
+        name_of = self._labels.__getitem__
+        for vertex_id in touched:
+            neighbor_ids[vertex_id] = array('i', sorted(neighbor_ids[vertex_id], key=name_of))
+
+        self._edge_count += added
+        if added:
+            self._graph_changed()
+            self._components_stale = True
+        return added
+
+    def _graph_changed(self) -> None:
+        """
+        Drops results derived from the whole graph, called by every method that mutates it
+        """
+        self._edge_key_cache = None
+        self._edge_key_set_cache = None
+
+    def _link(self, u: str, v: str) -> None:
+        """
+        Inserts v's id among u's neighbor ids, keeping them in name order
+        """
+        row = self._neighbor_ids[self._vertex_ids[u]]
+        row.insert(self._name_position(row, v), self._vertex_ids[v])
+
+    def _unlink(self, u: str, v: str) -> None:
+        """
+        Deletes v's id from u's neighbor ids
+        """
+        row = self._neighbor_ids[self._vertex_ids[u]]
+        del row[self._name_position(row, v)]
 
+    def _name_position(self, row, name: str) -> int:
+        """
+        parameters:
+            row(array): neighbor ids in name order
+            name(str): vertex name
+
+        returns:
+            index of the first id in row whose name is not below name
+
+        functionality:
+            binary search comparing the names of the ids, O(log d) name comparisons
+        """
+        labels = self._labels
+        low, high = 0, len(row)
+        while low < high:
+            middle = (low + high) // 2
+            if labels[row[middle]] < name:
+                low = middle + 1
+            else:
+                high = middle
+        return low
 
     def add_edge(self, u: str, v: str) -> None:
         """
@@ -77,13 +249,23 @@ class UndirectedGraph:
         if v not in self.adj_list:
             self.add_vertex(v)
 
+        if u in self.adj_list[v]:
+            return
+
+        self._graph_changed()
+
         # add u to adjacent neighbors of v
-        if u not in self.adj_list[v]:
-            self.adj_list[v].append(u)
+        self.adj_list[v][u] = None
 
         # add v to adjacent neighbors of u
-        if v not in self.adj_list[u]:
-            self.adj_list[u].append(v)
+        self.adj_list[u][v] = None
+
+        self._link(u, v)
+        self._link(v, u)
+
+        self._edge_count += 1
+        if not self._components_stale:
+            self._union(u, v)
 
 
     def remove_edge(self, v: str, u: str) -> None:
@@ -101,9 +283,22 @@ class UndirectedGraph:
 
         if v in self.adj_list and u in self.adj_list:
             if u in self.adj_list[v]:
+                self._graph_changed()
                 # if it exists in one, it exists in the other
-                self.adj_list[v].remove(u)
-                self.adj_list[u].remove(v)
+                del self.adj_list[v][u]
+                del self.adj_list[u][v]
+                self._unlink(v, u)
+                self._unlink(u, v)
+                self._edge_count -= 1
+
+                # whether this split a component is only worked out when someone asks, see
+                # count_connected_components(). Past V pending removals the checks would most
+                # likely run out of budget there anyway, so the list is not kept growing
+                if not self._components_stale:
+                    self._removed_edges.append((u, v))
+                    if len(self._removed_edges) > len(self.adj_list):
+                        self._components_stale = True
+                        self._removed_edges = []
 
     def remove_vertex(self, v: str) -> None:
         """
@@ -123,9 +318,30 @@ class UndirectedGraph:
         else:
             return
 
+        self._graph_changed()
+
+        if not self._components_stale:
+            if neighbors or self._removed_edges:
+                # v's component may fall apart into several, and with removals pending v may still
+                # share a set with vertices it is no longer connected to
+                self._components_stale = True
+            else:
+                # an isolated vertex is a set of its own, nothing else points to it
+                del self._parent[v]
+                del self._set_size[v]
+                self._component_count -= 1
+
         for neighbor in neighbors:
             # remove v from each of v's neighbor's neighbor-list
-            self.adj_list[neighbor].remove(v)
+            del self.adj_list[neighbor][v]
+            self._unlink(neighbor, v)
+        self._edge_count -= len(neighbors)
+
+        # free v's id for the next vertex added
+        vertex_id = self._vertex_ids.pop(v)
+        self._labels[vertex_id] = None
+        self._neighbor_ids[vertex_id] = array('i')
+        self._free_ids.append(vertex_id)
 
         # finally remove the vertex from the dictionary of vertices
         self.adj_list.pop(v, None)
@@ -157,15 +373,15 @@ class UndirectedGraph:
         """
         edges = []
 
-        added = {}
+        # position of each vertex in adj_list, an edge is reported from whichever endpoint comes first
+        # so (A, C) and (C, A) are not both included
+        position = {vertex: index for index, vertex in enumerate(self.adj_list)}
 
         for vertex in self.adj_list:
-
+            vertex_position = position[vertex]
             for neighbor in self.adj_list[vertex]:
-                # make sure we don't include duplicate edges since (A, C) = (C, A) in an undirected graph
-                if (vertex, neighbor) not in added and (neighbor, vertex) not in added:
+                if position[neighbor] > vertex_position:
                     edges.append((vertex, neighbor))
-                    added[(vertex, neighbor)] = True
 
         return edges
         
@@ -209,6 +425,57 @@ class UndirectedGraph:
             path_ind += 1
 
 
+    def validate_paths(self, paths, offsets=None, workers=None, use_numpy=True):
+        """
+        parameters:
+            paths(iterable): paths to check, each a sequence of vertices. With offsets, the vertices of
+                all paths back to back in one flat sequence
+            offsets(sequence) OPTIONAL: path i is paths[offsets[i]:offsets[i + 1]], so there is one more
+                offset than paths
+            workers(int) OPTIONAL: number of worker processes for very large batches, by default the
+                paths are checked in this process
+            use_numpy(bool) OPTIONAL: set to False to skip numpy even if it is installed
+
+        returns:
+            one boolean per path, the same as is_valid_path() gives for it: a numpy bool array when
+            numpy is used, else a list
+
+        functionality:
+            translates the vertex names to their interned ids (-1 for names not in the graph) and
+            checks every hop against the edge keys of _edge_keys(), see path_batches.check_paths()
+        """
+        if offsets is None:
+            paths, offsets = flatten_paths(paths)
+        keys = self._edge_keys()
+        if not numpy_used(use_numpy) and self._edge_key_set_cache is None:
+            self._edge_key_set_cache = set(keys)
+        index = self._vertex_ids
+        ids = [index.get(label, -1) for label in paths]
+        return validate_flat_paths(ids, offsets, len(self._labels), keys, workers, use_numpy,
+                                   self._edge_key_set_cache)
+
+    def _edge_keys(self):
+        """
+        parameters:
+            none
+
+        returns:
+            array of u * V + v over the interned ids for every edge, once per direction, ascending, V
+            being the number of ids including freed ones
+
+        functionality:
+            built in O(V + E log E) on first use and kept until the graph changes, only validate_paths()
+            needs it
+        """
+        if self._edge_key_cache is None:
+            v_count = len(self._labels)
+            keys = array('q')
+            for vertex_id, neighbors in enumerate(self._neighbor_ids):
+                base = vertex_id * v_count
+                keys.extend(sorted([base + neighbor for neighbor in neighbors]))
+            self._edge_key_cache = keys
+        return self._edge_key_cache
+
     def dfs(self, v_start, v_end=None) -> []:
         """
         parameters:
@@ -224,34 +491,80 @@ class UndirectedGraph:
             performs a DFS on the graph starting at the specified index and returns a list
             of all visited vertices
         """
+        if self.stats_hook is None:
+            return list(self._dfs_engine(v_start, v_end, None, None, None))
 
-        to_visit_stack = []
-        visited_stack = []
+        stats = CallStats('dfs')
+        visited = list(self._dfs_engine(v_start, v_end, None, None, stats))
+        self._report_traversal(stats, visited, v_end)
+        return visited
 
+    def iter_dfs(self, v_start, v_end=None, max_depth=None, stop_when=None):
+        """
+        parameters:
+            v_start(str): starting vertex
+            v_end(str) OPTIONAL: optional ending vertex
+            max_depth(int) OPTIONAL: only yield vertices at most this many edges from v_start. A vertex
+                first reached along a longer branch is expanded again when a shorter one reaches it, so
+                every such vertex is yielded, at the cost of up to max_depth + 1 expansions per vertex
+            stop_when(callable) OPTIONAL: predicate on a vertex, the search ends right after yielding
+                a vertex it is true for
+
+        returns:
+            generator of vertices in the order dfs() visits them
+
+        functionality:
+            lazy depth-first-search over the interned ids, with a bytearray visited set and neighbor ids
+            already in name order, ids are translated back to vertex names as they are yielded
+        """
+        return self._dfs_engine(v_start, v_end, max_depth, stop_when, None)
+
+    def _dfs_engine(self, v_start, v_end, max_depth, stop_when, stats):
+        """
+        generator behind iter_dfs() and dfs(), tracking the peak stack size into stats unless it is None
+        """
         if v_start not in self.adj_list:
-            return visited_stack
+            return
 
-        to_visit_stack.append(v_start)
-        to_visit_stack_len = 1
+        labels = self._labels
+        neighbor_ids = self._neighbor_ids
+        end_id = self._vertex_ids.get(v_end, -1)
+        visited = bytearray(len(labels))
+        to_visit_stack = [self._vertex_ids[v_start]]
+        push = to_visit_stack.append
+        if stats is not None:
+            push = counted_append(to_visit_stack, stats)
+            stats.peak_frontier = 1
+        # depth of each stack entry and the smallest depth each vertex was expanded at, only tracked
+        # when there is a limit
+        depth_stack = [0] if max_depth is not None else None
+        best_depth = {} if max_depth is not None else None
 
         # while we still need to visit vertices continue the traversal
-        while to_visit_stack_len > 0:
+        while to_visit_stack:
             curr_vertex = to_visit_stack.pop()
-            to_visit_stack_len -= 1
-            # only process non-visited vertices
-            if curr_vertex not in visited_stack:
-                visited_stack.append(curr_vertex)
+            depth = depth_stack.pop() if depth_stack is not None else 0
+            if visited[curr_vertex]:
+                # a visited vertex is only expanded again when reached along a shorter branch
+                if best_depth is None or depth >= best_depth[curr_vertex]:
+                    continue
+            else:
+                visited[curr_vertex] = 1
+                label = labels[curr_vertex]
+                yield label
                 # if an end is specified, this is where it comes to play
-                if curr_vertex == v_end:
-                    return visited_stack
-                # sort in reverse order so that the stack has the lowest values on top
-                curr_vertex_neighbors = sorted(self.adj_list[curr_vertex], reverse=True)
-                # descends from highest to lowest, appending lowest values top top of stack
-                for neighbor in curr_vertex_neighbors:
-                    to_visit_stack.append(neighbor)
-                    to_visit_stack_len += 1
-
-        return visited_stack
+                if curr_vertex == end_id or (stop_when is not None and stop_when(label)):
+                    return
+            if best_depth is not None:
+                best_depth[curr_vertex] = depth
+                if depth >= max_depth:
+                    continue
+            # neighbors are stored in name order, push from highest to lowest so the lowest is on top
+            for neighbor in reversed(neighbor_ids[curr_vertex]):
+                if not visited[neighbor] or (best_depth is not None and best_depth[neighbor] > depth + 1):
+                    push(neighbor)
+                    if depth_stack is not None:
+                        depth_stack.append(depth + 1)
 
     def bfs(self, v_start, v_end=None) -> []:
         """
@@ -265,33 +578,160 @@ class UndirectedGraph:
         functionality:
             returns in the order visited all vertices travelled to from start to end if end is reached
         """
-        to_visit_queue = []
-        visited_stack = []
+        if self.stats_hook is None:
+            return list(self._bfs_engine(v_start, v_end, None, None, None))
 
-        if v_start not in self.adj_list:
-            return visited_stack
+        stats = CallStats('bfs')
+        visited = list(self._bfs_engine(v_start, v_end, None, None, stats))
+        self._report_traversal(stats, visited, v_end)
+        return visited
+
+    def iter_bfs(self, v_start, v_end=None, max_depth=None, stop_when=None):
+        """
+        parameters:
+            v_start(str): starting vertex of BFS
+            v_end(str) OPTIONAL: ending vertex of BFS
+            max_depth(int) OPTIONAL: only visit vertices at most this many edges from v_start
+            stop_when(callable) OPTIONAL: predicate on a vertex, the search ends right after yielding
+                a vertex it is true for
 
-        to_visit_queue.append(v_start)
-        to_visit_queue_len = 1
+        returns:
+            generator of vertices in the order bfs() visits them
+
+        functionality:
+            lazy breadth-first-search over the interned ids, one level at a time so only the current and
+            next level are held
+
+            vertices are flagged when queued, which visits them in the same order as checking when they
+            are processed since only the first occurrence of a vertex in the queue was ever used
+        """
+        return self._bfs_engine(v_start, v_end, max_depth, stop_when, None)
 
-        while to_visit_queue_len > 0:
-            # dequeue
-            curr_vertex = to_visit_queue.pop(0)
-            to_visit_queue_len -= 1
+    def _bfs_engine(self, v_start, v_end, max_depth, stop_when, stats):
+        """
+        generator behind iter_bfs() and bfs(), tracking the widest level into stats unless it is None
+        """
+        if v_start not in self.adj_list:
+            return
 
-            if curr_vertex not in visited_stack:
-                visited_stack.append(curr_vertex)
+        labels = self._labels
+        neighbor_ids = self._neighbor_ids
+        end_id = self._vertex_ids.get(v_end, -1)
+        seen = bytearray(len(labels))
+        start_id = self._vertex_ids[v_start]
+        seen[start_id] = 1
+        level = [start_id]
+        depth = 0
+        if stats is not None:
+            stats.peak_frontier = 1
+
+        while level:
+            next_level = []
+            expand = max_depth is None or depth < max_depth
+            for curr_vertex in level:
+                label = labels[curr_vertex]
+                yield label
                 # if an end is specified, this is where it comes to play
-                if curr_vertex == v_end:
-                    return visited_stack
-                # sort in regular ascending order so that lower values are dequeued first
-                curr_vertex_neighbors = sorted(self.adj_list[curr_vertex])
-                # descends from highest to lowest, appending lowest values top top of stack
-                for neighbor in curr_vertex_neighbors:
-                    to_visit_queue.append(neighbor)
-                    to_visit_queue_len += 1
+                if curr_vertex == end_id or (stop_when is not None and stop_when(label)):
+                    return
+                if not expand:
+                    continue
+                # neighbors are stored in name order so lower names are processed first
+                for neighbor in neighbor_ids[curr_vertex]:
+                    if not seen[neighbor]:
+                        seen[neighbor] = 1
+                        next_level.append(neighbor)
+
+            if stats is not None and len(next_level) > stats.peak_frontier:
+                stats.peak_frontier = len(next_level)
+            level = next_level
+            depth += 1
+
+    def _report_traversal(self, stats, visited: [], v_end) -> None:
+        """
+        parameters:
+            stats(CallStats): counters of a dfs() or bfs() call
+            visited(list): the call's result
+            v_end(str): the call's ending vertex
+
+        returns:
+            none
+
+        functionality:
+            stops the clock, fills in the counters that follow from the result and hands stats to
+            stats_hook. Every visited vertex had its whole neighbor row looked at, except the ending
+            vertex, so the loops themselves need no edge counting
+        """
+        stats.finish()
+        stats.vertices_settled = len(visited)
+        expanded = visited[:-1] if visited and visited[-1] == v_end else visited
+        stats.edges_relaxed = sum(len(self.adj_list[vertex]) for vertex in expanded)
+        self.stats_hook(stats)
+
+    def shortest_path(self, u: str, v: str) -> []:
+        """
+        parameters:
+            u(str): start vertex
+            v(str): end vertex
+
+        returns:
+            list of vertices of a shortest path from u to v, empty if there is none
+
+        functionality:
+            bidirectional BFS: one search grows from u and one from v, always extending whichever
+            frontier is smaller by a whole level, until a vertex of one frontier has a neighbor the
+            other search has seen. The level where they first meet is finished so the shortest of the
+            meetings found in it is returned. Each search only has to cover about half the distance,
+            so far fewer vertices are explored than with bfs(u, v)
+        """
+        if u not in self.adj_list or v not in self.adj_list:
+            return []
+        if u == v:
+            return [u]
+
+        # per side: parent of every seen vertex and its distance from that side's start
+        parent_u, parent_v = {u: None}, {v: None}
+        depth_u, depth_v = {u: 0}, {v: 0}
+        frontier_u, frontier_v = [u], [v]
+
+        while frontier_u and frontier_v:
+            from_u = len(frontier_u) <= len(frontier_v)
+            if from_u:
+                frontier, parent, depth, other_depth = frontier_u, parent_u, depth_u, depth_v
+            else:
+                frontier, parent, depth, other_depth = frontier_v, parent_v, depth_v, depth_u
+
+            best = None
+            next_frontier = []
+            for vertex in frontier:
+                for neighbor in self.adj_list[vertex]:
+                    if neighbor in other_depth:
+                        if best is None or other_depth[neighbor] < other_depth[best[1]]:
+                            best = (vertex, neighbor)
+                    elif neighbor not in parent:
+                        parent[neighbor] = vertex
+                        depth[neighbor] = depth[vertex] + 1
+                        next_frontier.append(neighbor)
+
+            if best is not None:
+                near, far = best if from_u else (best[1], best[0])
+                # near is on u's side, far on v's side, and they are adjacent
+                path = []
+                while near is not None:
+                    path.append(near)
+                    near = parent_u[near]
+                path.reverse()
+                while far is not None:
+                    path.append(far)
+                    far = parent_v[far]
+                return path
+
+            if from_u:
+                frontier_u = next_frontier
+            else:
+                frontier_v = next_frontier
 
-        return visited_stack
+        return []
 
     def count_connected_components(self)->int:
         """
@@ -304,27 +744,132 @@ class UndirectedGraph:
         functionality:
             finds and counts all connected components in the graph
 
-            all vertices travelled to via a DFS/BFS produces a connected component, I use
-            this property to count all unique DFS connected components
+            every vertex starts as a set of its own and add_edge() merges the sets of its endpoints,
+            so the number of sets is the number of components. This is O(1) while edits are only
+            insertions. Edges removed since the last call are checked here: if the endpoints of each
+            are still connected, nothing was split (any old path can go around the removed edges) and
+            the union-find stands, see _still_connected(). Otherwise, or after a vertex removal, the
+            union-find is rebuilt from the adjacency list in O(V + E)
+
+            a single check can cost O(V + E) too, so all checks of one call share a budget of V + 2E
+            vertices and neighbors scanned and the union-find is rebuilt once that is used up. The
+            call stays within about two rebuilds however many removals are pending
+        """
+        if not self._components_stale:
+            budget = len(self.adj_list) + 2 * self._edge_count
+            for u, v in self._removed_edges:
+                connected, work = self._still_connected(u, v, budget)
+                budget -= work
+                # a split, or the budget ran out before the check could tell
+                if not connected:
+                    self._components_stale = True
+                    break
+            self._removed_edges = []
+
+        if self._components_stale:
+            self._rebuild_components()
+
+        return self._component_count
+
+    def _find(self, v: str) -> str:
+        """
+        parameters:
+            v(str): vertex
+
+        returns:
+            representative vertex of the set containing v
+
+        functionality:
+            follows parent pointers to the root, halving the path on the way
+        """
+        parent = self._parent
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    def _union(self, u: str, v: str) -> bool:
         """
+        parameters:
+            u(str): vertex 1
+            v(str): vertex 2
+
+        returns:
+            True if u and v were in different sets and those were merged, False otherwise
 
-        # the idea here is that with DFS, is returns a list of all visited vertices
-        # therefore, it contains a connected component
+        functionality:
+            attaches the smaller set's root below the larger one's
+        """
+        root_u = self._find(u)
+        root_v = self._find(v)
+        if root_u == root_v:
+            return False
+
+        if self._set_size[root_u] < self._set_size[root_v]:
+            root_u, root_v = root_v, root_u
+        self._parent[root_v] = root_u
+        self._set_size[root_u] += self._set_size.pop(root_v)
+        self._component_count -= 1
+        return True
+
+    def _rebuild_components(self) -> None:
+        """
+        parameters:
+            none
+
+        returns:
+            none
+
+        functionality:
+            resets the union-find to one set per vertex and merges along every edge
+        """
+        self._parent = {vertex: vertex for vertex in self.adj_list}
+        self._set_size = dict.fromkeys(self.adj_list, 1)
+        self._component_count = len(self.adj_list)
+        self._components_stale = False
+        self._removed_edges = []
 
-        # so any accounted for vertex, or a vertex found from a DFS, will not need to be
-        # checked to find a potential connected component
-        component_count = 0
-        accounted_for = {}
         for vertex in self.adj_list:
-            # increment components each time an unaccounted for vertex is used as a DFS start
-            if vertex not in accounted_for:
-                component = self.dfs(vertex)
-                component_count += 1
+            for neighbor in self.adj_list[vertex]:
+                self._union(vertex, neighbor)
 
-                for link in component:
-                    accounted_for[link] = True
+    def _still_connected(self, u: str, v: str, budget: int):
+        """
+        parameters:
+            u(str): vertex 1
+            v(str): vertex 2
+            budget(int): number of vertices expanded plus neighbors scanned after which to give up
+
+        returns:
+            (connected, work) tuple: connected is True or False for whether a path between u and v
+            exists, or None if the budget ran out first, and work is the number of vertices expanded
+            plus neighbors scanned
 
-        return component_count
+        functionality:
+            runs a BFS from both vertices one vertex at a time each. It stops when the two searches
+            meet, or when one runs out of vertices, having then covered a whole component, so the cost
+            is bounded by the smaller of the two sides and by budget
+        """
+        seen_u, seen_v = {u}, {v}
+        queue_u, queue_v = deque([u]), deque([v])
+        work = 0
+
+        while queue_u and queue_v:
+            for queue, seen, other_seen in ((queue_u, seen_u, seen_v), (queue_v, seen_v, seen_u)):
+                neighbors = self.adj_list[queue.popleft()]
+                work += 1 + len(neighbors)
+                for neighbor in neighbors:
+                    if neighbor in other_seen:
+                        return True, work
+                    if neighbor not in seen:
+                        seen.add(neighbor)
+                        queue.append(neighbor)
+                if not queue:
+                    return False, work
+                if work > budget:
+                    return None, work
+
+        return False, work
 
     def has_cycle(self)->bool:
         """
@@ -337,52 +882,26 @@ class UndirectedGraph:
         functionality:
             determines whether or not graph is acyclic
 
-            for a cycle to exist in a graph, it must have at least as many edges as it does vertices
-            if I keep track of unique edges within each connected component, I can determine whether
-            or not this statement is True or False
+            an acyclic component with n vertices is a tree and has exactly n - 1 edges, any more and it
+            contains a cycle. So the graph is acyclic exactly when it has V - C edges, C being the number
+            of connected components. The edge count is kept by the edit methods and C by the union-find
+            of count_connected_components(), making this O(1) while edits are only insertions. Edge
+            removals since the last call cost connectivity checks bounded by O(V + E) in total, and
+            one O(V + E) rebuild if one of them split a component or the checks ran out of budget
         """
-        accounted_for = {}
-
-        # loop through each unique connected component (subgraph)
-        for vertex in self.adj_list:
-            # initialize edge count, to_visit and visited stack for each connected component
-            edge_count = 0
-            to_visit_stack = []
-            visited_stack = []
-            edges = {}
-
-            to_visit_stack.append(vertex)
-            to_visit_stack_len = 1
-
-            # increment components each time an unaccounted for vertex is used as a DFS start
-            if vertex not in accounted_for:
-
-                # while we still need to visit vertices continue the traversal
-                while to_visit_stack_len > 0:
-                    curr_vertex = to_visit_stack.pop()
-                    to_visit_stack_len -= 1
-                    # only process non-visited vertices
-                    if curr_vertex not in visited_stack:
-                        visited_stack.append(curr_vertex)
-                        # sort in reverse order so that the stack has the lowest values on top
-                        curr_vertex_neighbors = sorted(self.adj_list[curr_vertex], reverse=True)
-                        # descends from highest to lowest, appending lowest values top top of stack
-                        for neighbor in curr_vertex_neighbors:
-                            # account for unique edges
-                            if (curr_vertex, neighbor) not in edges and (neighbor, curr_vertex) not in edges:
-                                edge_count += 1
-                                edges[(curr_vertex, neighbor)] = True
-                            to_visit_stack.append(neighbor)
-                            to_visit_stack_len += 1
-
-                for link in visited_stack:
-                    accounted_for[link] = True
-
-            # this is the minimum size subgraph needed for a cycle to exist
-            if (edge_count >= 3) and edge_count >= len(visited_stack):
-                return True
-
-        return False
+        if self.stats_hook is None:
+            return self._edge_count > len(self.adj_list) - self.count_connected_components()
+
+        # only the union-find rebuild visits anything, the O(1) path reports all counters 0. The
+        # connectivity checks of pending removals are not counted
+        stats = CallStats('has_cycle')
+        if self._components_stale:
+            stats.vertices_settled = len(self.adj_list)
+            stats.edges_relaxed = 2 * self._edge_count
+        cyclic = self._edge_count > len(self.adj_list) - self.count_connected_components()
+        stats.finish()
+        self.stats_hook(stats)
+        return cyclic
 
 if __name__ == '__main__':
 